@@ -1,6 +1,7 @@
 import asyncio
 import os
 from logging.config import fileConfig
+from typing import Any
 
 from sqlalchemy import pool
 from sqlalchemy.engine import Connection
@@ -25,6 +26,20 @@ if config.config_file_name is not None:
 
 target_metadata = SQLModel.metadata
 
+# Database objects created by migrations but not declared on the models, that
+# autogenerate must not drop
+UNMAPPED_OBJECTS = {
+    ("column", "search_vector"),
+    ("index", "ix_item_search_vector"),
+}
+
+
+def include_object(
+    object: Any, name: str | None, type_: str, reflected: bool, compare_to: Any
+) -> bool:
+    return not (reflected and compare_to is None and (type_, name) in UNMAPPED_OBJECTS)
+
+
 # other values from the config, defined by the needs of env.py,
 # can be acquired:
 # my_important_option = config.get_main_option("my_important_option")
@@ -59,6 +74,7 @@ def run_migrations_offline() -> None:
     context.configure(
         url=url,
         target_metadata=target_metadata,
+        include_object=include_object,
         literal_binds=True,
         dialect_opts={"paramstyle": "named"},
     )
@@ -68,7 +84,11 @@ def run_migrations_offline() -> None:
 
 
 def do_run_migrations(connection: Connection) -> None:
-    context.configure(connection=connection, target_metadata=target_metadata)
+    context.configure(
+        connection=connection,
+        target_metadata=target_metadata,
+        include_object=include_object,
+    )
 
     with context.begin_transaction():
         context.run_migrations()
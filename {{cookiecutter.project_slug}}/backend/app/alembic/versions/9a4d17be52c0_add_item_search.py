@@ -0,0 +1,65 @@
+"""Add item search
+
+Replace the btree index on item.description, useless for searching free text,
+with a generated tsvector column over title and description and a GIN index.
+
+Revision ID: 9a4d17be52c0
+Revises: c5e2a81f4d3b
+Create Date: 2026-10-18 11:04:19.631027
+
+"""
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "9a4d17be52c0"
+down_revision = "c5e2a81f4d3b"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Titles weigh more than descriptions in the ranking
+    op.add_column(
+        "item",
+        sa.Column(
+            "search_vector",
+            postgresql.TSVECTOR(),
+            sa.Computed(
+                "setweight(to_tsvector('english', coalesce(title, '')), 'A') || "
+                "setweight(to_tsvector('english', coalesce(description, '')), 'B')",
+                persisted=True,
+            ),
+        ),
+    )
+    # Built and dropped concurrently, outside of a transaction, so that writes to
+    # the item table are not blocked meanwhile
+    with op.get_context().autocommit_block():
+        op.create_index(
+            "ix_item_search_vector",
+            "item",
+            ["search_vector"],
+            unique=False,
+            postgresql_using="gin",
+            postgresql_concurrently=True,
+        )
+        op.drop_index(
+            "ix_item_description", table_name="item", postgresql_concurrently=True
+        )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.create_index(
+            "ix_item_description",
+            "item",
+            ["description"],
+            unique=False,
+            postgresql_concurrently=True,
+        )
+        op.drop_index(
+            "ix_item_search_vector", table_name="item", postgresql_concurrently=True
+        )
+    op.drop_column("item", "search_vector")
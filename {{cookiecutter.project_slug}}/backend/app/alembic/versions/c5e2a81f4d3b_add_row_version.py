@@ -0,0 +1,33 @@
+"""Add row_version to user and item
+
+Revision ID: c5e2a81f4d3b
+Revises: 7d741e6b9ad4
+Create Date: 2026-10-18 10:12:41.208350
+
+"""
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "c5e2a81f4d3b"
+down_revision = "7d741e6b9ad4"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Existing rows start at version 1, like the rows created by the ORM
+    op.add_column(
+        "user",
+        sa.Column("row_version", sa.Integer(), server_default="1", nullable=False),
+    )
+    op.add_column(
+        "item",
+        sa.Column("row_version", sa.Integer(), server_default="1", nullable=False),
+    )
+
+
+def downgrade() -> None:
+    op.drop_column("item", "row_version")
+    op.drop_column("user", "row_version")
@@ -0,0 +1,45 @@
+"""Tune indexes
+
+Index the items of an owner in id order, and drop the indexes duplicating the
+primary keys.
+
+Revision ID: e8b3c6f0a215
+Revises: 9a4d17be52c0
+Create Date: 2026-10-18 11:48:52.114903
+
+"""
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "e8b3c6f0a215"
+down_revision = "9a4d17be52c0"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Built and dropped concurrently, outside of a transaction, so that writes to
+    # these large tables are not blocked meanwhile
+    with op.get_context().autocommit_block():
+        op.create_index(
+            "ix_item_owner_id_id",
+            "item",
+            ["owner_id", "id"],
+            unique=False,
+            postgresql_concurrently=True,
+        )
+        op.drop_index("ix_item_id", table_name="item", postgresql_concurrently=True)
+        op.drop_index("ix_user_id", table_name="user", postgresql_concurrently=True)
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.create_index(
+            "ix_user_id", "user", ["id"], unique=False, postgresql_concurrently=True
+        )
+        op.create_index(
+            "ix_item_id", "item", ["id"], unique=False, postgresql_concurrently=True
+        )
+        op.drop_index(
+            "ix_item_owner_id_id", table_name="item", postgresql_concurrently=True
+        )
@@ -0,0 +1,28 @@
+"""Add token_version to user
+
+Revision ID: f3a9d2c7b814
+Revises: e8b3c6f0a215
+Create Date: 2026-10-18 13:05:27.631904
+
+"""
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "f3a9d2c7b814"
+down_revision = "e8b3c6f0a215"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Existing rows start at version 0, like the rows created by the ORM
+    op.add_column(
+        "user",
+        sa.Column("token_version", sa.Integer(), server_default="0", nullable=False),
+    )
+
+
+def downgrade() -> None:
+    op.drop_column("user", "token_version")
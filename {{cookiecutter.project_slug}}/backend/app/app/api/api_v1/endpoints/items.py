@@ -1,9 +1,18 @@
-from typing import Any, cast
+import csv
+import io
+from typing import Any, AsyncIterator, Literal, Sequence, cast
 
-from fastapi import APIRouter, HTTPException
+import orjson
+from fastapi import APIRouter, Body, HTTPException, Request, Response
+from fastapi.responses import StreamingResponse
+from pydantic import ValidationError
+from sqlalchemy.engine import RowMapping
+from sqlmodel.ext.asyncio.session import AsyncSession
 
 from app import crud, models
 from app.api import deps
+from app.api.etag import check_if_match, is_not_modified, make_etag
+from app.api.responses import read_model_response
 
 router = APIRouter()
 
@@ -11,21 +20,79 @@ router = APIRouter()
 @router.get("/", response_model=list[models.ItemReadWithOwner])
 async def read_items(
     db: deps.AsyncGetDbDep,
+    request: Request,
     *,
-    current_user: deps.CurrentActiveUserDep,
+    current_user: deps.CurrentActivePrincipalDep,
     offset: int = 0,
     limit: int = 100,
+    cursor: str | None = None,
+    count: crud.CountMode | None = None,
+    search: str | None = None,
 ) -> Any:
     """
     Retrieve items.
+
+    Pass `search` to only get the items whose title or description match it,
+    best matches first. It supports the web search syntax, e.g.
+    `"exact phrase" -excluded or`.
+
+    Pass the `X-Next-Cursor` response header back as `cursor` to fetch the next
+    page with keyset pagination instead of `offset`.
+
+    Pass `count` to get the total number of items in the `X-Total-Count` header:
+    `exact`, `estimated` (cheaper, approximate for large totals) or `cached`
+    (exact, but up to a minute old).
     """
-    if crud.user.is_superuser(current_user):
-        items = await crud.item.get_multi(db, offset=offset, limit=limit)
-    else:
-        items = await crud.item.get_multi_by_owner(
-            db=db, owner_id=current_user.id, offset=offset, limit=limit
-        )
-    return items
+    owner_id = None if crud.user.is_superuser(current_user) else current_user.id
+    try:
+        if search is not None:
+            items, next_cursor = await crud.item.search(
+                db,
+                query=search,
+                owner_id=owner_id,
+                offset=offset,
+                limit=limit,
+                cursor=cursor,
+                options=crud.crud_item.WITH_OWNER,
+            )
+        elif owner_id is None:
+            items = await crud.item.get_multi(
+                db,
+                offset=offset,
+                limit=limit,
+                cursor=cursor,
+                options=crud.crud_item.WITH_OWNER,
+            )
+            next_cursor = crud.item.next_cursor(items, limit=limit)
+        else:
+            items = await crud.item.get_multi_by_owner(
+                db=db,
+                owner_id=owner_id,
+                offset=offset,
+                limit=limit,
+                cursor=cursor,
+                options=crud.crud_item.WITH_OWNER,
+            )
+            next_cursor = crud.item.next_cursor(items, limit=limit)
+    except crud.InvalidCursorError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    owners = {item.owner_id: item.owner for item in items}
+    headers = {"ETag": make_etag(*items, *owners.values())}
+    if next_cursor:
+        headers["X-Next-Cursor"] = next_cursor
+    if count is not None:
+        if search is not None:
+            total = await crud.item.count_search(
+                db, query=search, owner_id=owner_id, mode=count
+            )
+        elif owner_id is None:
+            total = await crud.item.count(db, mode=count)
+        else:
+            total = await crud.item.count_by_owner(db, owner_id=owner_id, mode=count)
+        headers["X-Total-Count"] = str(total)
+    if is_not_modified(request, headers["ETag"]):
+        return Response(status_code=304, headers=headers)
+    return read_model_response(models.ItemReadWithOwner, items, headers=headers)
 
 
 @router.post("/", response_model=models.ItemReadWithOwner)
@@ -33,7 +100,7 @@ async def create_item(
     db: deps.AsyncGetDbDep,
     *,
     item_in: models.ItemCreate,
-    current_user: deps.CurrentActiveUserDep,
+    current_user: deps.CurrentActivePrincipalDep,
 ) -> Any:
     """
     Create new item.
@@ -44,17 +111,166 @@ async def create_item(
     return item
 
 
-@router.get("/{id}", response_model=models.ItemReadWithOwner)
-async def read_item(
+async def _ndjson_lines(
+    chunks: AsyncIterator[Sequence[RowMapping]],
+) -> AsyncIterator[bytes]:
+    async for rows in chunks:
+        # orjson, as ORJSONResponse, also encodes datetimes, UUIDs and the like
+        yield b"".join(orjson.dumps(dict(row)) + b"\n" for row in rows)
+
+
+async def _csv_lines(
+    chunks: AsyncIterator[Sequence[RowMapping]], columns: list[str]
+) -> AsyncIterator[bytes]:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(columns)
+    yield buffer.getvalue().encode()
+    async for rows in chunks:
+        buffer.seek(0)
+        buffer.truncate()
+        writer.writerows([row[column] for column in columns] for row in rows)
+        yield buffer.getvalue().encode()
+
+
+@router.get("/export", response_class=StreamingResponse)
+async def export_items(
     db: deps.AsyncGetDbDep,
     *,
-    id: int,
-    current_user: deps.CurrentActiveUserDep,
+    current_user: deps.CurrentActivePrincipalDep,
+    format: Literal["ndjson", "csv"] = "ndjson",
 ) -> Any:
     """
-    Get item by ID.
+    Export items as NDJSON or CSV.
+
+    Rows are streamed from a server-side cursor as they are read, so the export
+    starts immediately and its memory use does not depend on the number of items.
+    """
+    columns = list(models.ItemRead.__fields__)
+    if crud.user.is_superuser(current_user):
+        chunks = crud.item.stream_rows(db, columns=columns)
+    else:
+        chunks = crud.item.stream_rows_by_owner(
+            db, owner_id=current_user.id, columns=columns
+        )
+    if format == "csv":
+        return StreamingResponse(
+            _csv_lines(chunks, columns),
+            media_type="text/csv",
+            headers={"Content-Disposition": 'attachment; filename="items.csv"'},
+        )
+    return StreamingResponse(_ndjson_lines(chunks), media_type="application/x-ndjson")
+
+
+def _bulk_permission_error(
+    owner_ids: dict[int, int], id: int, current_user: models.UserPrincipal
+) -> str | None:
+    if id not in owner_ids:
+        return "Item not found"
+    if not crud.user.is_superuser(current_user) and (owner_ids[id] != current_user.id):
+        return "Not enough permissions"
+    return None
+
+
+@router.post("/bulk", response_model=models.ItemBulkResult)
+async def create_items(
+    db: deps.AsyncGetDbDep,
+    *,
+    items_in: list[dict[str, Any]] = Body(...),
+    current_user: deps.CurrentActivePrincipalDep,
+) -> Any:
+    """
+    Create many items in one transaction.
+
+    Rows that fail validation are reported in `errors`, the others are created.
+    """
+    objs_in: list[models.ItemCreate] = []
+    errors: list[models.BulkError] = []
+    for index, row in enumerate(items_in):
+        try:
+            objs_in.append(
+                models.ItemCreate.parse_obj({**row, "owner_id": current_user.id})
+            )
+        except ValidationError as e:
+            errors.append(models.BulkError(index=index, detail=e.errors()))
+    items = await crud.item.create_many_with_owner(
+        db, objs_in=objs_in, owner_id=current_user.id
+    )
+    return models.ItemBulkResult(items=items, errors=errors)
+
+
+@router.patch("/bulk", response_model=models.ItemBulkResult)
+async def update_items(
+    db: deps.AsyncGetDbDep,
+    *,
+    items_in: list[dict[str, Any]] = Body(...),
+    current_user: deps.CurrentActivePrincipalDep,
+) -> Any:
+    """
+    Update many items, identified by their `id`, in one transaction.
+
+    Rows that fail validation or that the user may not update are reported in
+    `errors`, the others are updated.
     """
-    item = await crud.item.get(db, id=id)
+    parsed: list[tuple[int, models.ItemBulkUpdate]] = []
+    errors: list[models.BulkError] = []
+    for index, row in enumerate(items_in):
+        try:
+            parsed.append((index, models.ItemBulkUpdate.parse_obj(row)))
+        except ValidationError as e:
+            errors.append(models.BulkError(index=index, detail=e.errors()))
+    owner_ids = await crud.item.get_owner_ids(
+        db, ids=[item_in.id for _, item_in in parsed]
+    )
+    # New owners are checked here, a missing one would fail the whole UPDATE
+    new_owner_ids = await crud.user.get_existing_ids(
+        db, ids=[item_in.owner_id for _, item_in in parsed if item_in.owner_id]
+    )
+    updates: dict[int, models.ItemUpdate | dict[str, Any]] = {}
+    for index, item_in in parsed:
+        error = _bulk_permission_error(owner_ids, item_in.id, current_user)
+        if not error and item_in.owner_id and item_in.owner_id not in new_owner_ids:
+            error = "Owner not found"
+        if error:
+            errors.append(models.BulkError(index=index, detail=error))
+        else:
+            updates[item_in.id] = item_in
+    items = await crud.item.update_many(
+        db, objs_in=updates, options=crud.crud_item.WITHOUT_OWNER
+    )
+    return models.ItemBulkResult(items=items, errors=errors)
+
+
+@router.delete("/bulk", response_model=models.ItemBulkResult)
+async def delete_items(
+    db: deps.AsyncGetDbDep,
+    *,
+    ids: list[int] = Body(...),
+    current_user: deps.CurrentActivePrincipalDep,
+) -> Any:
+    """
+    Delete many items in one statement.
+
+    Ids that do not exist or that the user may not delete are reported in
+    `errors`, the others are deleted.
+    """
+    owner_ids = await crud.item.get_owner_ids(db, ids=ids)
+    to_remove: list[int] = []
+    errors: list[models.BulkError] = []
+    for index, id in enumerate(ids):
+        error = _bulk_permission_error(owner_ids, id, current_user)
+        if error:
+            errors.append(models.BulkError(index=index, detail=error))
+        else:
+            to_remove.append(id)
+    items = await crud.item.remove_many(db, ids=to_remove)
+    return models.ItemBulkResult(items=items, errors=errors)
+
+
+async def _get_item(
+    db: AsyncSession, *, id: int, current_user: models.UserPrincipal
+) -> models.Item:
+    item = await crud.item.get(db, id=id, options=crud.crud_item.WITH_OWNER)
     if not item:
         raise HTTPException(status_code=404, detail="Item not found")
     if not crud.user.is_superuser(current_user) and (item.owner_id != current_user.id):
@@ -62,32 +278,66 @@ async def read_item(
     return item
 
 
+@router.get("/{id}", response_model=models.ItemReadWithOwner)
+async def read_item(
+    db: deps.AsyncGetDbDep,
+    request: Request,
+    response: Response,
+    *,
+    id: int,
+    current_user: deps.CurrentActivePrincipalDep,
+) -> Any:
+    """
+    Get item by ID.
+
+    Answers 304 when `If-None-Match` holds the current `ETag` of the item.
+    """
+    item = await _get_item(db, id=id, current_user=current_user)
+    etag = make_etag(item, item.owner)
+    if is_not_modified(request, etag):
+        return Response(status_code=304, headers={"ETag": etag})
+    response.headers["ETag"] = etag
+    return item
+
+
 @router.patch("/{id}", response_model=models.ItemReadWithOwner)
 async def update_item(
     db: deps.AsyncGetDbDep,
+    request: Request,
+    response: Response,
     *,
     id: int,
     item_in: models.ItemUpdate,
-    current_user: deps.CurrentActiveUserDep,
+    current_user: deps.CurrentActivePrincipalDep,
 ) -> Any:
     """
     Update an item.
+
+    Pass the `ETag` of the item as `If-Match` to only update it if it did not
+    change since, otherwise 412 is returned.
     """
-    item = await read_item(db, id=id, current_user=current_user)
+    item = await _get_item(db, id=id, current_user=current_user)
+    check_if_match(request, make_etag(item, item.owner))
     item = await crud.item.update(db, db_obj=item, obj_in=item_in)
+    response.headers["ETag"] = make_etag(item, item.owner)
     return item
 
 
 @router.delete("/{id}", response_model=models.ItemReadWithOwner)
 async def delete_item(
     db: deps.AsyncGetDbDep,
+    request: Request,
     *,
     id: int,
-    current_user: deps.CurrentActiveUserDep,
+    current_user: deps.CurrentActivePrincipalDep,
 ) -> Any:
     """
     Delete an item.
+
+    Pass the `ETag` of the item as `If-Match` to only delete it if it did not
+    change since, otherwise 412 is returned.
     """
-    item = await read_item(db, id=id, current_user=current_user)
+    item = await _get_item(db, id=id, current_user=current_user)
+    check_if_match(request, make_etag(item, item.owner))
     item = await crud.item.remove(db, db_obj=item)
     return item
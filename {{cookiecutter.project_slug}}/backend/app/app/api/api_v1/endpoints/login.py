@@ -33,11 +33,26 @@ async def login_access_token(
         raise HTTPException(status_code=400, detail="Incorrect email or password")
     elif not crud.user.is_active(user):
         raise HTTPException(status_code=400, detail="Inactive user")
-    access_token_expires = timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
+    if settings.ACCESS_TOKEN_CLAIMS:
+        access_token = security.create_access_token(
+            user.id,
+            expires_delta=timedelta(
+                minutes=settings.ACCESS_TOKEN_CLAIMS_EXPIRE_MINUTES
+            ),
+            claims={
+                "email": user.email,
+                "is_active": user.is_active,
+                "is_superuser": user.is_superuser,
+                "token_version": user.token_version,
+            },
+        )
+    else:
+        access_token = security.create_access_token(
+            user.id,
+            expires_delta=timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES),
+        )
     return {
-        "access_token": security.create_access_token(
-            user.id, expires_delta=access_token_expires
-        ),
+        "access_token": access_token,
         "token_type": "bearer",
     }
 
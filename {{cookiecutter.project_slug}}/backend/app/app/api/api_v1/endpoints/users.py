@@ -1,10 +1,13 @@
 from typing import Any
 
-from fastapi import APIRouter, Body, HTTPException
+from fastapi import APIRouter, Body, HTTPException, Request, Response
 from pydantic.networks import EmailStr
+from sqlmodel.ext.asyncio.session import AsyncSession
 
 from app import crud, models
 from app.api import deps
+from app.api.etag import check_if_match, is_not_modified, make_etag
+from app.api.responses import read_model_response
 from app.core.config import settings
 from app.utils import send_new_account_email
 
@@ -14,16 +17,45 @@ router = APIRouter()
 @router.get("/", response_model=list[models.UserReadWithItems])
 async def read_users(
     db: deps.AsyncGetDbDep,
+    request: Request,
     *,
-    current_user: deps.CurrentActiveSuperuserDep,
+    current_user: deps.CurrentActiveSuperuserPrincipalDep,
     offset: int = 0,
     limit: int = 100,
+    cursor: str | None = None,
+    count: crud.CountMode | None = None,
 ) -> Any:
     """
     Retrieve users.
+
+    Pass the `X-Next-Cursor` response header back as `cursor` to fetch the next
+    page with keyset pagination instead of `offset`.
+
+    Pass `count` to get the total number of users in the `X-Total-Count` header:
+    `exact`, `estimated` (cheaper, approximate for large totals) or `cached`
+    (exact, but up to a minute old).
     """
-    users = await crud.user.get_multi(db, offset=offset, limit=limit)
-    return users
+    try:
+        users = await crud.user.get_multi(
+            db,
+            offset=offset,
+            limit=limit,
+            cursor=cursor,
+            options=crud.crud_user.WITH_ITEMS,
+        )
+    except crud.InvalidCursorError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    next_cursor = crud.user.next_cursor(users, limit=limit)
+    headers = {
+        "ETag": make_etag(*users, *(item for user in users for item in user.items))
+    }
+    if next_cursor:
+        headers["X-Next-Cursor"] = next_cursor
+    if count is not None:
+        headers["X-Total-Count"] = str(await crud.user.count(db, mode=count))
+    if is_not_modified(request, headers["ETag"]):
+        return Response(status_code=304, headers=headers)
+    return read_model_response(models.UserReadWithItems, users, headers=headers)
 
 
 @router.post("/", response_model=models.UserReadWithItems)
@@ -31,7 +63,7 @@ async def create_user(
     db: deps.AsyncGetDbDep,
     *,
     user_in: models.UserCreate,
-    current_user: deps.CurrentActiveSuperuserDep,
+    current_user: deps.CurrentActiveSuperuserPrincipalDep,
 ) -> Any:
     """
     Create new user.
@@ -53,6 +85,8 @@ async def create_user(
 @router.patch("/me", response_model=models.UserReadWithItems)
 async def update_user_me(
     db: deps.AsyncGetDbDep,
+    request: Request,
+    response: Response,
     *,
     password: str = Body(None),
     full_name: str = Body(None),
@@ -61,7 +95,11 @@ async def update_user_me(
 ) -> Any:
     """
     Update own user.
+
+    Pass the `ETag` of the user as `If-Match` to only update it if it did not
+    change since, otherwise 412 is returned.
     """
+    check_if_match(request, make_etag(current_user, *current_user.items))
     user_in = models.UserUpdate()
     if password is not None:
         user_in.password = password
@@ -70,16 +108,25 @@ async def update_user_me(
     if email is not None:
         user_in.email = email
     user = await crud.user.update(db, db_obj=current_user, obj_in=user_in)
+    response.headers["ETag"] = make_etag(user, *user.items)
     return user
 
 
 @router.get("/me", response_model=models.UserReadWithItems)
 async def read_user_me(
+    request: Request,
+    response: Response,
     current_user: deps.CurrentActiveUserDep,
 ) -> Any:
     """
     Get current user.
+
+    Answers 304 when `If-None-Match` holds the current `ETag` of the user.
     """
+    etag = make_etag(current_user, *current_user.items)
+    if is_not_modified(request, etag):
+        return Response(status_code=304, headers={"ETag": etag})
+    response.headers["ETag"] = etag
     return current_user
 
 
@@ -110,67 +157,82 @@ async def create_user_open(
     return user
 
 
+async def _get_user(
+    db: AsyncSession, *, user_id: int, current_user: models.UserPrincipal
+) -> models.User:
+    if user_id != current_user.id and not crud.user.is_superuser(current_user):
+        raise HTTPException(
+            status_code=400, detail="The user doesn't have enough privileges"
+        )
+    user = await crud.user.get(db, id=user_id, options=crud.crud_user.WITH_ITEMS)
+    if not user:
+        raise HTTPException(
+            status_code=404,
+            detail="The user with this username does not exist in the system",
+        )
+    return user
+
+
 @router.get("/{user_id}", response_model=models.UserReadWithItems)
 async def read_user_by_id(
     db: deps.AsyncGetDbDep,
+    request: Request,
+    response: Response,
     *,
     user_id: int,
-    current_user: deps.CurrentActiveUserDep,
+    current_user: deps.CurrentActivePrincipalDep,
 ) -> Any:
     """
     Get a specific user by id.
+
+    Answers 304 when `If-None-Match` holds the current `ETag` of the user.
     """
-    user = await crud.user.get(db, id=user_id)
-    if user == current_user:
-        return user
-    if not crud.user.is_superuser(current_user):
-        raise HTTPException(
-            status_code=400, detail="The user doesn't have enough privileges"
-        )
-    if not user:
-        raise HTTPException(
-            status_code=404,
-            detail="The user with this username does not exist in the system",
-        )
+    user = await _get_user(db, user_id=user_id, current_user=current_user)
+    etag = make_etag(user, *user.items)
+    if is_not_modified(request, etag):
+        return Response(status_code=304, headers={"ETag": etag})
+    response.headers["ETag"] = etag
     return user
 
 
 @router.patch("/{user_id}", response_model=models.UserReadWithItems)
 async def update_user(
     db: deps.AsyncGetDbDep,
+    request: Request,
+    response: Response,
     *,
     user_id: int,
     user_in: models.UserUpdate,
-    current_user: deps.CurrentActiveSuperuserDep,
+    current_user: deps.CurrentActiveSuperuserPrincipalDep,
 ) -> Any:
     """
     Update a user.
+
+    Pass the `ETag` of the user as `If-Match` to only update it if it did not
+    change since, otherwise 412 is returned.
     """
-    user = await crud.user.get(db, id=user_id)
-    if not user:
-        raise HTTPException(
-            status_code=404,
-            detail="The user with this username does not exist in the system",
-        )
+    user = await _get_user(db, user_id=user_id, current_user=current_user)
+    check_if_match(request, make_etag(user, *user.items))
     user = await crud.user.update(db, db_obj=user, obj_in=user_in)
+    response.headers["ETag"] = make_etag(user, *user.items)
     return user
 
 
 @router.delete("/{user_id}", response_model=models.UserReadWithItems)
 async def delete_user(
     db: deps.AsyncGetDbDep,
+    request: Request,
     *,
     user_id: int,
-    current_user: deps.CurrentActiveSuperuserDep,
+    current_user: deps.CurrentActiveSuperuserPrincipalDep,
 ) -> Any:
     """
     Delete a user.
+
+    Pass the `ETag` of the user as `If-Match` to only delete it if it did not
+    change since, otherwise 412 is returned.
     """
-    user = await read_user_by_id(db, user_id=user_id, current_user=current_user)
-    if not user:
-        raise HTTPException(
-            status_code=404,
-            detail="The user with this username does not exist in the system",
-        )
+    user = await _get_user(db, user_id=user_id, current_user=current_user)
+    check_if_match(request, make_etag(user, *user.items))
     user = await crud.user.remove(db, db_obj=user)
     return user
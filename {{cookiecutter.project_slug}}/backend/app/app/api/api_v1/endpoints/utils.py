@@ -5,6 +5,7 @@ from pydantic.networks import EmailStr
 
 from app import models
 from app.api import deps
+from app.db.session import get_pool_metrics
 from app.utils import send_test_email
 
 router = APIRouter()
@@ -21,10 +22,20 @@ def ping() -> Any:
 @router.post("/test-email/", response_model=models.Msg, status_code=201)
 def test_email(
     email_to: EmailStr,
-    current_user: deps.CurrentActiveSuperuserDep,
+    current_user: deps.CurrentActiveSuperuserPrincipalDep,
 ) -> Any:
     """
     Test emails.
     """
     send_test_email(email_to=email_to)
     return {"msg": "Test email sent"}
+
+
+@router.get("/db-pool/", response_model=dict[str, models.PoolStatus])
+def db_pool(
+    current_user: deps.CurrentActiveSuperuserPrincipalDep,
+) -> Any:
+    """
+    Connection pool usage of the worker serving the request.
+    """
+    return get_pool_metrics()
@@ -1,6 +1,6 @@
 from typing import Annotated, AsyncGenerator, Generator
 
-from fastapi import Depends, HTTPException, status
+from fastapi import Depends, HTTPException, Request, status
 from fastapi.security import OAuth2PasswordBearer
 from jose import jwt
 from jose.exceptions import JWTError
@@ -16,6 +16,9 @@ reusable_oauth2 = OAuth2PasswordBearer(
     tokenUrl=f"{settings.API_V1_STR}/login/access-token"
 )
 
+# Requests authorized by the claims of a token alone, see `get_current_principal`
+SAFE_METHODS = {"GET", "HEAD", "OPTIONS"}
+
 
 def get_db() -> Generator:
     with Session() as session:
@@ -30,10 +33,9 @@ async def async_get_db() -> AsyncGenerator:
 AsyncGetDbDep = Annotated[SQLModelAsyncSession, Depends(async_get_db)]
 
 
-async def get_current_user(
-    db: AsyncGetDbDep,
-    token: Annotated[str, Depends(reusable_oauth2)],
-) -> models.User:
+def get_token_payload(
+    token: Annotated[str, Depends(reusable_oauth2)]
+) -> models.TokenPayload:
     try:
         payload = jwt.decode(
             token, settings.SECRET_KEY, algorithms=[security.ALGORITHM]
@@ -44,9 +46,92 @@ async def get_current_user(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Could not validate credentials",
         )
-    user = await crud.user.get(db, id=token_data.sub)
+    return token_data
+
+
+TokenPayloadDep = Annotated[models.TokenPayload, Depends(get_token_payload)]
+
+
+def check_token_version(payload: models.TokenPayload, token_version: int) -> None:
+    """
+    Reject a token carrying claims when the user changed since it was issued.
+    """
+    if payload.token_version is not None and payload.token_version != token_version:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Could not validate credentials",
+        )
+
+
+async def get_current_principal(
+    request: Request,
+    db: AsyncGetDbDep,
+    payload: TokenPayloadDep,
+) -> models.UserPrincipal:
+    """
+    Authorize reads with the claims of the token when it carries them, without
+    a database lookup.
+
+    Writes always look the user up, bypassing the principal cache, to reject
+    tokens revoked by another worker.
+    """
+    has_claims = payload.token_version is not None
+    if has_claims and request.method in SAFE_METHODS:
+        # The token is signed by us, skip validating its claims again
+        return models.UserPrincipal.construct(
+            id=payload.sub, **payload.dict(exclude={"sub"})
+        )
+    principal = None
+    if request.method in SAFE_METHODS:
+        principal = crud.crud_user.principal_cache.get(payload.sub)
+    if principal is None:
+        principal = await crud.user.get_principal(db, id=payload.sub)
+        if not principal:
+            raise HTTPException(status_code=404, detail="User not found")
+        crud.crud_user.principal_cache.set(payload.sub, principal)
+    check_token_version(payload, principal.token_version)
+    return principal
+
+
+CurrentPrincipalDep = Annotated[models.UserPrincipal, Depends(get_current_principal)]
+
+
+def get_current_active_principal(
+    current_principal: CurrentPrincipalDep,
+) -> models.UserPrincipal:
+    if not crud.user.is_active(current_principal):
+        raise HTTPException(status_code=400, detail="Inactive user")
+    return current_principal
+
+
+CurrentActivePrincipalDep = Annotated[
+    models.UserPrincipal, Depends(get_current_active_principal)
+]
+
+
+def get_current_active_superuser_principal(
+    current_principal: CurrentActivePrincipalDep,
+) -> models.UserPrincipal:
+    if not crud.user.is_superuser(current_principal):
+        raise HTTPException(
+            status_code=400, detail="The user doesn't have enough privileges"
+        )
+    return current_principal
+
+
+CurrentActiveSuperuserPrincipalDep = Annotated[
+    models.UserPrincipal, Depends(get_current_active_superuser_principal)
+]
+
+
+async def get_current_user(
+    db: AsyncGetDbDep,
+    payload: TokenPayloadDep,
+) -> models.User:
+    user = await crud.user.get(db, id=payload.sub)
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
+    check_token_version(payload, user.token_version)
     return user
 
 
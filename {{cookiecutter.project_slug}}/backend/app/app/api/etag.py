@@ -0,0 +1,52 @@
+import hashlib
+import json
+from typing import Any
+
+from fastapi import HTTPException, Request
+
+
+def make_etag(*objs: Any) -> str:
+    """
+    Strong ETag of a representation built from `objs`, derived from the id and
+    `row_version` of each of them: it changes whenever one of them is updated,
+    added or removed.
+    """
+    versions = [[type(obj).__name__, obj.id, obj.row_version] for obj in objs]
+    raw = json.dumps(versions, separators=(",", ":")).encode()
+    return f'"{hashlib.blake2b(raw, digest_size=16).hexdigest()}"'
+
+
+def _parse_etags(header: str, *, weak: bool) -> set[str]:
+    etags = {etag.strip() for etag in header.split(",")}
+    if weak:
+        return {etag.removeprefix("W/") for etag in etags}
+    # Strong comparison: a weak tag, e.g. added by a compressing proxy, can only
+    # tell that the representation is equivalent, not that it is unchanged
+    return {etag for etag in etags if not etag.startswith("W/")}
+
+
+def is_not_modified(request: Request, etag: str) -> bool:
+    """
+    Whether `If-None-Match` matches `etag` by weak comparison, so that a 304 can
+    be returned.
+    """
+    header = request.headers.get("If-None-Match")
+    if header is None:
+        return False
+    etags = _parse_etags(header, weak=True)
+    return "*" in etags or etag in etags
+
+
+def check_if_match(request: Request, etag: str) -> None:
+    """
+    Refuse to modify a resource that changed since the client read it, when the
+    client sent `If-Match`. As required for `If-Match`, weak tags never match.
+    """
+    header = request.headers.get("If-Match")
+    if header is None:
+        return
+    etags = _parse_etags(header, weak=False)
+    if "*" not in etags and etag not in etags:
+        raise HTTPException(
+            status_code=412, detail="The resource was modified by another request"
+        )
@@ -0,0 +1,62 @@
+from functools import lru_cache
+from typing import Any
+
+from fastapi.responses import ORJSONResponse
+from pydantic.fields import SHAPE_LIST, SHAPE_SINGLETON
+from sqlmodel import SQLModel
+
+# (name, nested read model or None, whether the field is a list)
+FieldPlan = tuple[tuple[str, type[SQLModel] | None, bool], ...]
+
+
+@lru_cache
+def _field_plan(read_model: type[SQLModel]) -> FieldPlan:
+    plan = []
+    for name, field in read_model.__fields__.items():
+        if field.shape not in (SHAPE_SINGLETON, SHAPE_LIST):
+            raise TypeError(f"Cannot dump {read_model.__name__}.{name}")
+        nested = field.type_ if issubclass(field.type_, SQLModel) else None
+        plan.append((name, nested, field.shape == SHAPE_LIST))
+    return tuple(plan)
+
+
+def dump_read_model(read_model: type[SQLModel], obj: Any) -> dict[str, Any]:
+    """
+    Read the fields of `read_model`, nested read models included, off `obj`.
+
+    `obj` is not validated: it must come from the database, whose rows were
+    already validated on their way in.
+    """
+    data = {}
+    for name, nested, is_list in _field_plan(read_model):
+        value = getattr(obj, name)
+        if nested is not None and value is not None:
+            if is_list:
+                value = [dump_read_model(nested, v) for v in value]
+            else:
+                value = dump_read_model(nested, value)
+        data[name] = value
+    return data
+
+
+def read_model_response(
+    read_model: type[SQLModel],
+    content: Any,
+    *,
+    status_code: int = 200,
+    headers: dict[str, str] | None = None,
+) -> ORJSONResponse:
+    """
+    Serialize `content`, an ORM object or a list of them, as `read_model`.
+
+    FastAPI validates the value returned by an endpoint against its
+    `response_model` (running e.g. the email validator on every row), then
+    walks the result again with `jsonable_encoder`. Here the fields are read
+    once and dumped straight to orjson. Keep `response_model` on the route so
+    that the OpenAPI schema stays documented.
+    """
+    if isinstance(content, (list, tuple)):
+        data: Any = [dump_read_model(read_model, obj) for obj in content]
+    else:
+        data = dump_read_model(read_model, content)
+    return ORJSONResponse(data, status_code=status_code, headers=headers)
@@ -0,0 +1,78 @@
+"""
+Profile the import of app.main, and fail when it exceeds its budget.
+
+Each run imports the app in a fresh interpreter with `-X importtime`. The
+slowest modules of the fastest run are listed, then the check fails when the
+import takes more than `--budget-ms`, or when it imports one of the modules
+only needed on first use (database drivers, email stack), which would slow down
+every cold start again:
+python -m app.benchmarks.import_time --budget-ms 1000
+"""
+import argparse
+import re
+import subprocess
+import sys
+from typing import NamedTuple
+
+# Imported on first use, see app.db.session and app.utils
+DEFERRED_MODULES = {"asyncpg", "psycopg2", "emails", "jinja2"}
+
+IMPORT_TIME_LINE = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \|\s+(\S+)")
+
+
+class ImportTime(NamedTuple):
+    module: str
+    self_us: int
+    cumulative_us: int
+
+
+def profile_import(module: str) -> list[ImportTime]:
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    times = []
+    for line in result.stderr.splitlines():
+        match = IMPORT_TIME_LINE.match(line)
+        if match:
+            self_us, cumulative_us, name = match.groups()
+            times.append(ImportTime(name, int(self_us), int(cumulative_us)))
+    return times
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--module", default="app.main")
+    parser.add_argument("--budget-ms", type=float, default=1000)
+    parser.add_argument("--runs", type=int, default=5, help="the fastest is kept")
+    parser.add_argument("--top", type=int, default=15, help="slowest modules shown")
+    args = parser.parse_args()
+
+    runs = [profile_import(args.module) for _ in range(args.runs)]
+    times = min(runs, key=lambda run: run[-1].cumulative_us)
+    total_ms = times[-1].cumulative_us / 1000
+    print(f"{'self ms':>9} {'cumulative ms':>14}  module")
+    slowest = sorted(times, key=lambda entry: entry.self_us, reverse=True)
+    for entry in slowest[: args.top]:
+        print(
+            f"{entry.self_us / 1000:>9.1f} {entry.cumulative_us / 1000:>14.1f}  "
+            f"{entry.module}"
+        )
+    print(f"import {args.module}: {total_ms:.0f} ms, budget {args.budget_ms:.0f} ms")
+
+    failed = False
+    imported = {entry.module.split(".")[0] for entry in times}
+    for module in sorted(DEFERRED_MODULES & imported):
+        print(f"{module} is imported on startup, it should be imported on first use")
+        failed = True
+    if total_ms > args.budget_ms:
+        print(f"import {args.module} exceeds its budget")
+        failed = True
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
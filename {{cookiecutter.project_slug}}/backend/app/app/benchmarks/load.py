@@ -0,0 +1,238 @@
+"""
+Load test the API and compare runs.
+
+`run` seeds a benchmark user and its items, then drives the API with
+`--concurrency` virtual users for `--duration` seconds, each repeating: read
+/users/me, list items, create, read, update and delete an item. Requests go
+to the app in-process through ASGI, or to `--url` when given (e.g. a server
+started with gunicorn, for realistic numbers: in-process, the load generator
+competes with the app for the same CPU). Latency percentiles and throughput
+are written per endpoint as JSON.
+
+`compare` flags the endpoints whose p95 latency grew, or whose throughput
+dropped, by more than `--threshold` between two runs, and exits non-zero.
+
+Run it with:
+python -m app.benchmarks.load run --concurrency 20 --duration 30 -o new.json
+python -m app.benchmarks.load compare base.json new.json
+"""
+import argparse
+import asyncio
+import json
+import statistics
+import sys
+import time
+from collections import defaultdict
+from datetime import datetime, timezone
+from typing import Any
+
+import httpx
+
+from app import crud, models
+from app.core.config import settings
+from app.db.session import AsyncSession, get_engine_async
+
+BENCH_EMAIL = "load-test@example.com"
+BENCH_PASSWORD = "load-test-password"
+
+
+async def seed(items: int) -> None:
+    """
+    Create the benchmark user, and its items up to `items`.
+    """
+    async with AsyncSession() as db:
+        user = await crud.user.get_by_email(db, email=BENCH_EMAIL)
+        if not user:
+            user = await crud.user.create(
+                db,
+                obj_in=models.UserCreate(email=BENCH_EMAIL, password=BENCH_PASSWORD),
+            )
+        assert user.id is not None
+        missing = items - await crud.item.count_by_owner(db, owner_id=user.id)
+        if missing > 0:
+            await crud.item.create_many_with_owner(
+                db,
+                objs_in=[
+                    models.ItemCreate(title=f"Load test item {i}", owner_id=user.id)
+                    for i in range(missing)
+                ],
+                owner_id=user.id,
+            )
+
+
+class Recorder:
+    def __init__(self) -> None:
+        self.latencies: dict[str, list[float]] = defaultdict(list)
+        self.errors: dict[str, int] = defaultdict(int)
+
+    async def request(
+        self, client: httpx.AsyncClient, name: str, method: str, url: str, **kwargs: Any
+    ) -> httpx.Response:
+        start = time.perf_counter()
+        response = await client.request(method, url, **kwargs)
+        self.latencies[name].append(time.perf_counter() - start)
+        if response.status_code >= 400:
+            self.errors[name] += 1
+        return response
+
+
+async def virtual_user(
+    client: httpx.AsyncClient, recorder: Recorder, deadline: float
+) -> None:
+    api = settings.API_V1_STR
+    response = await recorder.request(
+        client,
+        "POST /login/access-token",
+        "POST",
+        f"{api}/login/access-token",
+        data={"username": BENCH_EMAIL, "password": BENCH_PASSWORD},
+    )
+    response.raise_for_status()
+    headers = {"Authorization": f"Bearer {response.json()['access_token']}"}
+    while time.monotonic() < deadline:
+        await recorder.request(
+            client, "GET /users/me", "GET", f"{api}/users/me", headers=headers
+        )
+        await recorder.request(
+            client, "GET /items/", "GET", f"{api}/items/?limit=50", headers=headers
+        )
+        response = await recorder.request(
+            client,
+            "POST /items/",
+            "POST",
+            f"{api}/items/",
+            headers=headers,
+            json={"title": "Load test item", "owner_id": 0},
+        )
+        if response.status_code >= 400:
+            continue
+        url = f"{api}/items/{response.json()['id']}"
+        await recorder.request(client, "GET /items/{id}", "GET", url, headers=headers)
+        await recorder.request(
+            client,
+            "PATCH /items/{id}",
+            "PATCH",
+            url,
+            headers=headers,
+            json={"description": "Updated by the load test"},
+        )
+        await recorder.request(
+            client, "DELETE /items/{id}", "DELETE", url, headers=headers
+        )
+
+
+def summarize(latencies: list[float], errors: int, elapsed: float) -> dict[str, Any]:
+    ms = sorted(latency * 1000 for latency in latencies)
+    # quantiles() needs two samples, n=100 gives the 1st to 99th percentiles
+    percentiles = (
+        statistics.quantiles(ms, n=100, method="inclusive") if len(ms) > 1 else ms * 99
+    )
+    return {
+        "requests": len(ms),
+        "errors": errors,
+        "throughput_rps": round(len(ms) / elapsed, 2),
+        "mean_ms": round(statistics.fmean(ms), 3),
+        "p50_ms": round(percentiles[49], 3),
+        "p95_ms": round(percentiles[94], 3),
+        "p99_ms": round(percentiles[98], 3),
+        "max_ms": round(ms[-1], 3),
+    }
+
+
+async def run(args: argparse.Namespace) -> dict[str, Any]:
+    await seed(args.items)
+    if args.url:
+        transport: httpx.AsyncBaseTransport = httpx.AsyncHTTPTransport()
+        base_url = args.url
+    else:
+        from app.main import app
+
+        transport = httpx.ASGITransport(app=app)  # type: ignore
+        base_url = "http://load-test"
+    limits = httpx.Limits(max_connections=args.concurrency)
+    recorder = Recorder()
+    async with httpx.AsyncClient(
+        transport=transport, base_url=base_url, limits=limits, timeout=60
+    ) as client:
+        start = time.monotonic()
+        await asyncio.gather(
+            *(
+                virtual_user(client, recorder, start + args.duration)
+                for _ in range(args.concurrency)
+            )
+        )
+        elapsed = time.monotonic() - start
+    await get_engine_async().dispose()
+    return {
+        "started_at": datetime.now(timezone.utc).isoformat(),
+        "target": args.url or "asgi",
+        "concurrency": args.concurrency,
+        "duration_s": round(elapsed, 3),
+        "endpoints": {
+            name: summarize(latencies, recorder.errors[name], elapsed)
+            for name, latencies in sorted(recorder.latencies.items())
+        },
+    }
+
+
+def compare(base: dict[str, Any], new: dict[str, Any], threshold: float) -> bool:
+    """
+    Print the change of each endpoint, return whether one of them regressed.
+    """
+    regressed = False
+    print(f"{'endpoint':<26}{'p95 ms':>20}{'req/s':>20}")
+    for name, new_stats in new["endpoints"].items():
+        base_stats = base["endpoints"].get(name)
+        if base_stats is None:
+            print(f"{name:<26}{'(new)':>20}")
+            continue
+        p95 = new_stats["p95_ms"] / base_stats["p95_ms"] - 1
+        rps = new_stats["throughput_rps"] / base_stats["throughput_rps"] - 1
+        flag = ""
+        if p95 > threshold or rps < -threshold or new_stats["errors"]:
+            flag = "  REGRESSION"
+            regressed = True
+        print(
+            f"{name:<26}"
+            f"{base_stats['p95_ms']:>8.1f} → {new_stats['p95_ms']:>6.1f} {p95:+4.0%}"
+            f"{base_stats['throughput_rps']:>8.1f} → "
+            f"{new_stats['throughput_rps']:>6.1f} {rps:+4.0%}{flag}"
+        )
+    return regressed
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    run_parser = subparsers.add_parser("run", help="Load test the API")
+    run_parser.add_argument("--concurrency", type=int, default=10)
+    run_parser.add_argument("--duration", type=float, default=30, help="seconds")
+    run_parser.add_argument("--items", type=int, default=1000, help="items to seed")
+    run_parser.add_argument("--url", help="e.g. http://localhost, in-process if unset")
+    run_parser.add_argument("-o", "--output", help="JSON report, stdout if unset")
+    compare_parser = subparsers.add_parser("compare", help="Compare two reports")
+    compare_parser.add_argument("base")
+    compare_parser.add_argument("new")
+    compare_parser.add_argument(
+        "--threshold", type=float, default=0.1, help="tolerated change, 0.1 = 10%%"
+    )
+    args = parser.parse_args()
+
+    if args.command == "run":
+        report = json.dumps(asyncio.run(run(args)), indent=2)
+        if args.output:
+            with open(args.output, "w") as f:
+                f.write(report + "\n")
+        else:
+            print(report)
+    else:
+        with open(args.base) as f:
+            base = json.load(f)
+        with open(args.new) as f:
+            new = json.load(f)
+        if compare(base, new, args.threshold):
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+"""
+Measure the memory used by gunicorn workers, with and without PRELOAD_APP.
+
+For each mode, gunicorn is started with `--workers` workers, the API is warmed
+up with a few requests, then the proportional set size (PSS) of the master and
+of each worker is read from /proc: pages shared after the fork are split
+between the processes sharing them, so PSS sums to the real memory use.
+
+Run it inside the backend container (Linux only):
+python -m app.benchmarks.memory --workers 4
+"""
+import argparse
+import json
+import os
+import signal
+import subprocess
+import time
+import urllib.request
+from typing import Any
+
+
+def read_pss_kib(pid: int) -> int:
+    with open(f"/proc/{pid}/smaps_rollup") as f:
+        for line in f:
+            if line.startswith("Pss:"):
+                return int(line.split()[1])
+    raise RuntimeError(f"No Pss in /proc/{pid}/smaps_rollup")
+
+
+def get_children(pid: int) -> list[int]:
+    children: list[int] = []
+    for task in os.listdir(f"/proc/{pid}/task"):
+        with open(f"/proc/{pid}/task/{task}/children") as f:
+            children.extend(int(child) for child in f.read().split())
+    return children
+
+
+def wait_for_workers(master: int, workers: int, url: str, timeout: float) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            if len(get_children(master)) >= workers:
+                urllib.request.urlopen(url, timeout=1).read()
+                return
+        except OSError:
+            pass
+        time.sleep(0.2)
+    raise TimeoutError("gunicorn did not start in time")
+
+
+def measure(args: argparse.Namespace, preload: bool) -> dict[str, Any]:
+    env = {
+        **os.environ,
+        "PRELOAD_APP": str(preload).lower(),
+        "WEB_CONCURRENCY": str(args.workers),
+        "BIND": f"127.0.0.1:{args.port}",
+        "ACCESS_LOG": "",
+    }
+    process = subprocess.Popen(
+        [
+            "gunicorn",
+            "-k",
+            "uvicorn.workers.UvicornWorker",
+            "-c",
+            args.config,
+            "app.main:app",
+        ],
+        env=env,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    url = f"http://127.0.0.1:{args.port}/api/v1/openapi.json"
+    try:
+        wait_for_workers(process.pid, args.workers, url, timeout=60)
+        # Each worker imports and builds what the first requests need
+        for _ in range(args.workers * args.requests):
+            urllib.request.urlopen(url, timeout=5).read()
+        workers = [read_pss_kib(pid) for pid in get_children(process.pid)]
+        master = read_pss_kib(process.pid)
+    finally:
+        process.send_signal(signal.SIGTERM)
+        process.wait(timeout=30)
+    return {
+        "master_pss_mib": round(master / 1024, 1),
+        "worker_pss_mib": [round(pss / 1024, 1) for pss in workers],
+        "mean_worker_pss_mib": round(sum(workers) / len(workers) / 1024, 1),
+        "total_pss_mib": round((master + sum(workers)) / 1024, 1),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--requests", type=int, default=5, help="per worker")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--config", default="/gunicorn_conf.py")
+    args = parser.parse_args()
+
+    results = {
+        "workers": args.workers,
+        "default": measure(args, preload=False),
+        "preload": measure(args, preload=True),
+    }
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+"""
+Compare the CPU cost of serializing a page of items with its owners.
+
+Run it with: python -m app.benchmarks.serialization [--items 100] [--rounds 200]
+"""
+import argparse
+import asyncio
+import json
+import time
+from typing import Any, Awaitable, Callable
+
+from fastapi.responses import JSONResponse, ORJSONResponse
+from fastapi.routing import serialize_response
+from fastapi.utils import create_response_field
+
+from app import models
+from app.api.responses import read_model_response
+
+
+def build_page(size: int) -> list[models.Item]:
+    owners = [
+        models.User(
+            id=i,
+            email=f"user{i}@example.com",
+            full_name=f"User {i}",
+            hashed_password="",
+        )
+        for i in range(10)
+    ]
+    return [
+        models.Item(
+            id=i,
+            title=f"Item {i}",
+            description="Lorem ipsum dolor sit amet " * 4,
+            owner_id=owners[i % 10].id,
+            owner=owners[i % 10],
+        )
+        for i in range(size)
+    ]
+
+
+async def timed(rounds: int, render: Callable[[], Awaitable[bytes]]) -> float:
+    start = time.process_time()
+    for _ in range(rounds):
+        await render()
+    return (time.process_time() - start) / rounds
+
+
+async def main(items: int, rounds: int) -> None:
+    page = build_page(items)
+    field = create_response_field(
+        name="Response_read_items", type_=list[models.ItemReadWithOwner]
+    )
+
+    async def fastapi_json() -> bytes:
+        content = await serialize_response(field=field, response_content=page)
+        return JSONResponse(content).body
+
+    async def fastapi_orjson() -> bytes:
+        content = await serialize_response(field=field, response_content=page)
+        return ORJSONResponse(content).body
+
+    async def read_model_orjson() -> bytes:
+        return read_model_response(models.ItemReadWithOwner, page).body
+
+    paths: dict[str, Callable[[], Awaitable[Any]]] = {
+        "response_model + JSONResponse": fastapi_json,
+        "response_model + ORJSONResponse": fastapi_orjson,
+        "read_model_response": read_model_orjson,
+    }
+    bodies = [json.loads(await render()) for render in paths.values()]
+    assert all(body == bodies[0] for body in bodies), "Serializations differ"
+    baseline = None
+    print(f"CPU time per page of {items} items, over {rounds} rounds")
+    for name, render in paths.items():
+        seconds = await timed(rounds, render)
+        baseline = baseline or seconds
+        print(f"{name:<34}{seconds * 1000:8.3f} ms {seconds / baseline:6.0%}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--items", type=int, default=100)
+    parser.add_argument("--rounds", type=int, default=200)
+    args = parser.parse_args()
+    asyncio.run(main(args.items, args.rounds))
@@ -0,0 +1,95 @@
+"""
+Compare the Python overhead of building the statements of the hot CRUD queries
+on every call, as before, with reusing the ones cached by CRUDBase.
+
+Each call builds or fetches the statement and computes its cache key, which
+SQLAlchemy does on execution to look its compiled form up. The database round
+trip, identical in both cases, is left out. Run it with:
+python -m app.benchmarks.statements --calls 10000
+"""
+import argparse
+import timeit
+import typing
+from typing import Any, Callable
+
+from sqlalchemy import bindparam
+from sqlmodel import select
+
+from app import crud
+from app.crud.crud_item import WITH_OWNER
+from app.crud.crud_user import WITH_ITEMS
+from app.models import Item, User
+
+
+def rebuilt_get() -> Any:
+    return select(User).where(User.id == 42).options(*WITH_ITEMS)
+
+
+def rebuilt_get_by_email() -> Any:
+    return select(User).filter(User.email == "user@example.com")
+
+
+# https://github.com/tiangolo/sqlmodel/issues/54#issuecomment-907935531
+@typing.no_type_check
+def rebuilt_get_multi_by_owner() -> Any:
+    return (
+        select(Item)
+        .where(Item.owner_id == 42)
+        .order_by(Item.id)
+        .where(Item.id > 1000)
+        .limit(100)
+        .options(*WITH_OWNER)
+    )
+
+
+def cached_get() -> Any:
+    return crud.user._cached_statement(
+        ("get", tuple(WITH_ITEMS)),
+        lambda: select(User).where(User.id == bindparam("id")).options(*WITH_ITEMS),
+    )
+
+
+def cached_get_by_email() -> Any:
+    return crud.user._cached_statement(
+        "get_by_email",
+        lambda: select(User).filter(User.email == bindparam("email")),
+    )
+
+
+def cached_get_multi_by_owner() -> Any:
+    return crud.item._cached_statement(
+        ("get_multi_by_owner", "id", True, False, tuple(WITH_OWNER)),
+        lambda: crud.item._paginate(
+            select(Item).where(Item.owner_id == bindparam("owner_id")),
+            after_cursor=True,
+        ).options(*WITH_OWNER),
+    )
+
+
+def per_call_us(get_statement: Callable[[], Any], calls: int) -> float:
+    def call() -> None:
+        get_statement()._generate_cache_key()
+
+    return min(timeit.repeat(call, number=calls, repeat=5)) / calls * 1e6
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--calls", type=int, default=10_000)
+    args = parser.parse_args()
+
+    print(f"{'query':<20}{'rebuilt µs':>12}{'cached µs':>12}")
+    for name, rebuilt, cached in [
+        ("get", rebuilt_get, cached_get),
+        ("get_by_email", rebuilt_get_by_email, cached_get_by_email),
+        ("get_multi_by_owner", rebuilt_get_multi_by_owner, cached_get_multi_by_owner),
+    ]:
+        # Both statements must compile to the same SQL, their values aside
+        assert str(rebuilt()).split("WHERE")[0] == str(cached()).split("WHERE")[0]
+        rebuilt_us = per_call_us(rebuilt, args.calls)
+        cached_us = per_call_us(cached, args.calls)
+        print(f"{name:<20}{rebuilt_us:>12.2f}{cached_us:>12.2f}")
+
+
+if __name__ == "__main__":
+    main()
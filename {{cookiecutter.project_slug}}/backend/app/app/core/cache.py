@@ -0,0 +1,71 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Generic, Hashable, TypeVar
+
+KeyType = TypeVar("KeyType", bound=Hashable)
+ValueType = TypeVar("ValueType")
+
+
+class TTLCache(Generic[KeyType, ValueType]):
+    def __init__(self, *, maxsize: int, ttl: float):
+        """
+        In-process cache bounded to `maxsize` entries (least recently used are
+        evicted first) whose entries also expire `ttl` seconds after being set.
+
+        Each worker process has its own cache, so writes done by another worker
+        are only seen once the entry expires: keep `ttl` short.
+
+        **Parameters**
+
+        * `maxsize`: Maximum number of entries, `0` disables the cache
+        * `ttl`: Lifetime of an entry in seconds
+        """
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._data: OrderedDict[KeyType, tuple[float, ValueType]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: KeyType) -> ValueType | None:
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            expires_at, value = entry
+            if expires_at <= time.monotonic():
+                del self._data[key]
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key: KeyType, value: ValueType) -> None:
+        if self.maxsize <= 0:
+            return
+        with self._lock:
+            self._data[key] = (time.monotonic() + self.ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, key: KeyType) -> None:
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    def stats(self) -> dict[str, int]:
+        return {
+            "size": len(self._data),
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+        }
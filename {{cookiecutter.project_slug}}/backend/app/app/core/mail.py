@@ -0,0 +1,188 @@
+import logging
+import queue
+import threading
+import time
+from functools import lru_cache
+from pathlib import Path
+from typing import Any, NamedTuple
+
+import emails
+from emails.backend import SMTPBackend
+from emails.template import JinjaTemplate
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+@lru_cache
+def get_template(name: str) -> JinjaTemplate:
+    """
+    Read and compile an email template of `EMAIL_TEMPLATES_DIR` once per process.
+    """
+    with open(Path(settings.EMAIL_TEMPLATES_DIR) / name) as f:
+        template = JinjaTemplate(f.read())
+    template.template  # compile now rather than on first render
+    return template
+
+
+def load_templates() -> None:
+    for path in Path(settings.EMAIL_TEMPLATES_DIR).glob("*.html"):
+        get_template(path.name)
+
+
+class EmailJob(NamedTuple):
+    email_to: str
+    subject: str
+    html_template: JinjaTemplate
+    environment: dict[str, Any]
+    attempt: int = 0
+
+
+def get_smtp_backend() -> SMTPBackend:
+    smtp_options: dict[str, Any] = {
+        "host": settings.SMTP_HOST,
+        "port": settings.SMTP_PORT,
+    }
+    if settings.SMTP_TLS:
+        smtp_options["tls"] = True
+    if settings.SMTP_USER:
+        smtp_options["user"] = settings.SMTP_USER
+    if settings.SMTP_PASSWORD:
+        smtp_options["password"] = settings.SMTP_PASSWORD
+    return SMTPBackend(fail_silently=False, **smtp_options)
+
+
+class MailQueue:
+    def __init__(self, *, workers: int, max_retries: int, retry_backoff: float):
+        """
+        Deliver emails from background threads so request handlers never wait on
+        the SMTP server.
+
+        Each worker thread keeps its own SMTP connection open between messages,
+        the workers together acting as a connection pool. Failed deliveries are
+        retried with exponential backoff.
+
+        **Parameters**
+
+        * `workers`: Number of delivery threads, and so of SMTP connections
+        * `max_retries`: Number of retries before an email is dropped
+        * `retry_backoff`: Delay before the first retry in seconds, doubled
+          for each following one
+        """
+        self.workers = workers
+        self.max_retries = max_retries
+        self.retry_backoff = retry_backoff
+        self._queue: queue.Queue[EmailJob | None] = queue.Queue()
+        self._threads: list[threading.Thread] = []
+        # Retries waiting for their delay, with the job they will queue again
+        self._timers: dict[threading.Timer, EmailJob] = {}
+        self._lock = threading.Lock()
+
+    def start(self) -> None:
+        with self._lock:
+            if self._threads:
+                return
+            for i in range(self.workers):
+                thread = threading.Thread(
+                    target=self._run, name=f"mail-queue-{i}", daemon=True
+                )
+                thread.start()
+                self._threads.append(thread)
+
+    def stop(self, timeout: float = 10) -> None:
+        """
+        Deliver the emails already queued, then stop the workers. Pending
+        retries are abandoned.
+
+        Blocks until the workers are done, up to `timeout` seconds in total.
+        """
+        with self._lock:
+            threads, self._threads = self._threads, []
+            timers, self._timers = self._timers, {}
+            for _ in threads:
+                self._queue.put(None)
+        for timer, job in timers.items():
+            timer.cancel()
+            logger.error(
+                f"Dropping email to {job.email_to} on shutdown, before retry "
+                f"{job.attempt}"
+            )
+        deadline = time.monotonic() + timeout
+        for thread in threads:
+            thread.join(max(deadline - time.monotonic(), 0))
+
+    def enqueue(self, job: EmailJob) -> None:
+        self.start()
+        self._queue.put(job)
+
+    def _deliver(self, backend: SMTPBackend, job: EmailJob) -> None:
+        message = emails.Message(
+            subject=job.subject,
+            html=job.html_template,
+            mail_from=(settings.EMAILS_FROM_NAME, settings.EMAILS_FROM_EMAIL),
+        )
+        response = message.send(to=job.email_to, render=job.environment, smtp=backend)
+        logger.info(f"send email result: {response}")
+
+    def _retry(self, job: EmailJob) -> None:
+        if job.attempt >= self.max_retries:
+            logger.error(
+                f"Dropping email to {job.email_to} after {job.attempt} retries"
+            )
+            return
+        delay = self.retry_backoff * 2**job.attempt
+        retry = job._replace(attempt=job.attempt + 1)
+        timer = threading.Timer(delay, self._requeue, args=(retry,))
+        timer.daemon = True
+        with self._lock:
+            self._timers[timer] = retry
+        timer.start()
+
+    def _requeue(self, job: EmailJob) -> None:
+        with self._lock:
+            timer = threading.current_thread()
+            if timer not in self._timers:  # cancelled by `stop()`
+                return
+            del self._timers[timer]  # type: ignore
+        self._queue.put(job)
+
+    def _close(self, backend: SMTPBackend) -> None:
+        # Closing a connection the server already dropped raises, as the backend
+        # does not fail silently; it is discarded all the same
+        try:
+            backend.close()
+        except Exception:
+            logger.warning("Failed to close the SMTP connection", exc_info=True)
+
+    def _handle(self, backend: SMTPBackend, job: EmailJob) -> None:
+        try:
+            self._deliver(backend, job)
+        except Exception:
+            logger.exception(f"Failed to send email to {job.email_to}")
+            try:
+                self._close(backend)
+            finally:
+                self._retry(job)
+
+    def _run(self) -> None:
+        backend = get_smtp_backend()
+        try:
+            while True:
+                job = self._queue.get()
+                if job is None:
+                    return
+                # Nothing restarts a worker that died, it must outlive any error
+                try:
+                    self._handle(backend, job)
+                except Exception:
+                    logger.exception("Unexpected error in the mail queue worker")
+        finally:
+            self._close(backend)
+
+
+mail_queue = MailQueue(
+    workers=settings.EMAIL_QUEUE_WORKERS,
+    max_retries=settings.EMAIL_MAX_RETRIES,
+    retry_backoff=settings.EMAIL_RETRY_BACKOFF_SECONDS,
+)
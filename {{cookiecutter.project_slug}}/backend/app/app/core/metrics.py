@@ -0,0 +1,74 @@
+import os
+
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    REGISTRY,
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    generate_latest,
+    multiprocess,
+)
+
+# Each gunicorn worker writes its samples to PROMETHEUS_MULTIPROC_DIR (set by
+# start.sh), and whichever worker serves /metrics aggregates all of them.
+MULTIPROCESS = bool(os.getenv("PROMETHEUS_MULTIPROC_DIR"))
+
+HTTP_REQUESTS = Counter(
+    "http_requests_total",
+    "HTTP requests by route template and status code",
+    ["method", "route", "status"],
+)
+HTTP_REQUEST_DURATION = Histogram(
+    "http_request_duration_seconds",
+    "HTTP request latency by route template",
+    ["method", "route"],
+)
+HTTP_REQUESTS_IN_PROGRESS = Gauge(
+    "http_requests_in_progress",
+    "HTTP requests being served",
+    ["method", "route"],
+    multiprocess_mode="livesum",
+)
+HTTP_REQUESTS_SHED = Counter(
+    "http_requests_shed_total",
+    "HTTP requests rejected with 503 as the worker was overloaded",
+    ["method", "route"],
+)
+DB_POOL_CHECKOUT_WAIT = Histogram(
+    "db_pool_checkout_wait_seconds",
+    "Time spent waiting for a connection from the pool",
+    ["pool"],
+    buckets=(0.0005, 0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 5, 30),
+)
+DB_POOL_CHECKED_OUT = Gauge(
+    "db_pool_connections_checked_out",
+    "Connections currently checked out of the pool",
+    ["pool"],
+    multiprocess_mode="livesum",
+)
+DB_POOL_SIZE = Gauge(
+    "db_pool_size",
+    "Configured number of persistent connections of the pool",
+    ["pool"],
+    multiprocess_mode="livesum",
+)
+PASSWORD_HASHING_DURATION = Histogram(
+    "password_hashing_seconds",
+    "Duration of bcrypt operations, including the wait for a free executor",
+    ["operation"],
+    buckets=(0.05, 0.1, 0.2, 0.3, 0.5, 0.75, 1, 2, 5),
+)
+
+
+def generate_metrics() -> tuple[bytes, str]:
+    """
+    Render the metrics in the Prometheus text format, with its content type.
+    """
+    if MULTIPROCESS:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    return generate_latest(registry), CONTENT_TYPE_LATEST
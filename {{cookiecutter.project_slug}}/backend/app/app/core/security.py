@@ -1,19 +1,27 @@
+import asyncio
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
 from datetime import datetime, timedelta
-from typing import Any
+from typing import Any, Callable, TypeVar
 
 from jose import jwt
 from passlib.context import CryptContext
 
+from app.core import metrics
 from app.core.config import settings
 
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 
+T = TypeVar("T")
+
 
 ALGORITHM = "HS256"
 
 
 def create_access_token(
-    subject: str | Any, expires_delta: timedelta | None = None
+    subject: str | Any,
+    expires_delta: timedelta | None = None,
+    claims: dict[str, Any] | None = None,
 ) -> str:
     if expires_delta:
         expire = datetime.utcnow() + expires_delta
@@ -21,7 +29,7 @@ def create_access_token(
         expire = datetime.utcnow() + timedelta(
             minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES
         )
-    to_encode = {"exp": expire, "sub": str(subject)}
+    to_encode = {**(claims or {}), "exp": expire, "sub": str(subject)}
     encoded_jwt = jwt.encode(to_encode, settings.SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
 
@@ -32,3 +40,64 @@ def verify_password(plain_password: str, hashed_password: str) -> bool:
 
 def get_password_hash(password: str) -> str:
     return pwd_context.hash(password)
+
+
+class PasswordHashingBusyError(RuntimeError):
+    pass
+
+
+_executor: Executor | None = None
+_pending = 0
+
+
+def get_password_executor() -> Executor:
+    # Created on first use, so that each (forked) worker gets its own pool
+    global _executor
+    if _executor is None:
+        if settings.PASSWORD_HASH_EXECUTOR == "process":
+            _executor = ProcessPoolExecutor(max_workers=settings.PASSWORD_HASH_WORKERS)
+        else:
+            _executor = ThreadPoolExecutor(
+                max_workers=settings.PASSWORD_HASH_WORKERS,
+                thread_name_prefix="password-hash",
+            )
+    return _executor
+
+
+def shutdown_password_executor() -> None:
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=False, cancel_futures=True)
+        _executor = None
+
+
+async def _run_in_password_executor(func: Callable[..., T], *args: Any) -> T:
+    """
+    Run a bcrypt call without blocking the event loop.
+
+    Refuse new work once `PASSWORD_HASH_MAX_PENDING` calls are already queued or
+    running, rather than letting a login burst pile up unbounded latency.
+    """
+    global _pending
+    if _pending >= settings.PASSWORD_HASH_MAX_PENDING:
+        raise PasswordHashingBusyError("Too many password operations in progress")
+    _pending += 1
+    start = time.perf_counter()
+    try:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(get_password_executor(), func, *args)
+    finally:
+        _pending -= 1
+        metrics.PASSWORD_HASHING_DURATION.labels(func.__name__).observe(
+            time.perf_counter() - start
+        )
+
+
+async def verify_password_async(plain_password: str, hashed_password: str) -> bool:
+    return await _run_in_password_executor(
+        verify_password, plain_password, hashed_password
+    )
+
+
+async def get_password_hash_async(password: str) -> str:
+    return await _run_in_password_executor(get_password_hash, password)
@@ -1,3 +1,4 @@
+from .base import CountMode, InvalidCursorError
 from .crud_item import item
 from .crud_user import user
 
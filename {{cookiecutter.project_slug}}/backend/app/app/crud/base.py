@@ -1,12 +1,73 @@
+import base64
+import json
 import typing
-from typing import Any, Generic, Type, TypeVar
+import uuid
+from collections import defaultdict
+from typing import (
+    Any,
+    AsyncIterator,
+    Callable,
+    Generic,
+    Hashable,
+    Literal,
+    Sequence,
+    Type,
+    TypeVar,
+)
 
+from sqlalchemy import Column, Integer, bindparam, column, delete, func, insert, inspect
+from sqlalchemy import select as sa_select
+from sqlalchemy import table, text, tuple_, update
+from sqlalchemy.engine import Row, RowMapping
+from sqlalchemy.sql.base import ExecutableOption
 from sqlmodel import SQLModel, select
 from sqlmodel.ext.asyncio.session import AsyncSession
+from sqlmodel.sql.expression import SelectOfScalar
+
+from app.core.cache import TTLCache
+from app.core.config import settings
 
 ModelType = TypeVar("ModelType", bound=SQLModel)
 CreateSchemaType = TypeVar("CreateSchemaType", bound=SQLModel)
 UpdateSchemaType = TypeVar("UpdateSchemaType", bound=SQLModel)
+StatementType = TypeVar("StatementType")
+
+CountMode = Literal["exact", "estimated", "cached"]
+
+
+class InvalidCursorError(ValueError):
+    pass
+
+
+def encode_cursor(order_by: str, values: Sequence[Any]) -> str:
+    """
+    Build an opaque, URL safe pagination cursor from the sort key of the last row.
+    """
+    raw = json.dumps({"o": order_by, "k": list(values)}, separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, order_by: str, types: Sequence[type]) -> list[Any]:
+    """
+    Sort key of a cursor built by `encode_cursor`, checked against the `types` of
+    its values so that a forged cursor is rejected rather than sent to the database.
+    """
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode()))
+    except ValueError:
+        raise InvalidCursorError("Malformed cursor")
+    if not isinstance(payload, dict) or payload.get("o") != order_by:
+        raise InvalidCursorError("Cursor does not match the requested ordering")
+    values = payload.get("k")
+    if not isinstance(values, list) or len(values) != len(types):
+        raise InvalidCursorError("Malformed cursor")
+    for value, type_ in zip(values, types):
+        # isinstance(True, int) holds, and a float key may be written as an int
+        accepted: type | tuple[type, ...] = (int, float) if type_ is float else type_
+        if isinstance(value, bool) or not isinstance(value, accepted):
+            raise InvalidCursorError("Malformed cursor")
+    return values
 
 
 class CRUDBase(Generic[ModelType, CreateSchemaType, UpdateSchemaType]):
@@ -19,21 +80,294 @@ class CRUDBase(Generic[ModelType, CreateSchemaType, UpdateSchemaType]):
         * `model`: A SQLModel table class
         """
         self.model = model
+        # Exact counts reused by count(mode="cached"), keyed by their SQL
+        self.count_cache: TTLCache[str, int] = TTLCache(
+            maxsize=settings.COUNT_CACHE_SIZE, ttl=settings.COUNT_CACHE_TTL_SECONDS
+        )
+        # Statements of the hot queries, see `_cached_statement`
+        self._statements: dict[Hashable, Any] = {}
+
+    # Rows per multi-row INSERT, keeps each statement below the bind parameter limit
+    bulk_batch_size = 1000
+    # From this many rows on, create_many loads them with COPY instead of INSERT
+    bulk_copy_threshold = 5000
+
+    # Estimates below this are replaced by an exact count, which is cheap there
+    count_exact_below = 1000
+
+    # Variants of statements kept by `_cached_statement`, beyond which they are
+    # built on each call, e.g. if callers pass new option objects every time
+    statement_cache_size = 64
+
+    def _cached_statement(
+        self, key: Hashable, build: Callable[[], StatementType]
+    ) -> StatementType:
+        """
+        Statement built by `build()` once per CRUD object and `key`, rather than on
+        every call.
+
+        The statement takes its values from `bindparam()`s, passed on execution.
+        Being the same object, SQLAlchemy finds its compiled form from the cache
+        key memoized on it, and as its SQL never changes, asyncpg reuses the
+        statement it prepared on the connection.
+        """
+        try:
+            statement = self._statements.get(key)
+        except TypeError:  # unhashable options
+            return build()
+        if statement is None:
+            statement = build()
+            if len(self._statements) < self.statement_cache_size:
+                self._statements[key] = statement
+        return statement
+
+    def _order_column(self, order_by: str) -> Column:
+        column = self.model.__table__.c.get(order_by)  # type: ignore
+        if column is None or not (
+            column.primary_key
+            or ((column.index or column.unique) and not column.nullable)
+        ):
+            raise ValueError(f"Cannot paginate {self.model.__name__} by {order_by!r}")
+        return column
+
+    def _paginate(
+        self,
+        statement: SelectOfScalar[ModelType],
+        *,
+        order_by: str = "id",
+        after_cursor: bool = False,
+        with_offset: bool = False,
+    ) -> SelectOfScalar[ModelType]:
+        """
+        Apply a stable ordering and either keyset (`after_cursor`) or offset
+        pagination, whose values are the parameters returned by `_page_params`.
+
+        Keyset pagination seeks directly to the last seen sort key through the
+        index, so its cost does not grow with the page depth like OFFSET does.
+        """
+        id_column = self._order_column("id")
+        column = self._order_column(order_by)
+        if column is id_column:
+            statement = statement.order_by(id_column)
+        else:
+            statement = statement.order_by(column, id_column)
+        cursor_id: Any = bindparam("cursor_id", type_=id_column.type)
+        if after_cursor and column is id_column:
+            statement = statement.where(id_column > cursor_id)
+        elif after_cursor:
+            cursor_key: Any = bindparam("cursor_key", type_=column.type)
+            statement = statement.where(
+                tuple_(column, id_column) > tuple_(cursor_key, cursor_id)
+            )
+        elif with_offset:
+            statement = statement.offset(bindparam("offset", type_=Integer()))
+        return statement.limit(bindparam("limit", type_=Integer()))
+
+    def _page_params(
+        self,
+        *,
+        offset: int = 0,
+        limit: int = 100,
+        cursor: str | None = None,
+        order_by: str = "id",
+    ) -> dict[str, Any]:
+        params: dict[str, Any] = {"limit": limit}
+        if cursor is not None:
+            # The id comes last, see `next_cursor`
+            columns = [self._order_column(order_by), self._order_column("id")]
+            if order_by == "id":
+                columns.pop()
+            # Type decorators, such as SQLModel's AutoString, know it from `impl`
+            types = [
+                getattr(column.type, "impl", column.type).python_type
+                for column in columns
+            ]
+            *key, params["cursor_id"] = decode_cursor(cursor, order_by, types)
+            if key:
+                params["cursor_key"] = key[0]
+        elif offset:
+            params["offset"] = offset
+        return params
+
+    def next_cursor(
+        self, items: Sequence[ModelType], *, limit: int, order_by: str = "id"
+    ) -> str | None:
+        """
+        Cursor of the page following `items`, or `None` when it was the last one.
+        """
+        if not items or len(items) < limit:
+            return None
+        last = items[-1]
+        values = [getattr(last, "id")]
+        if order_by != "id":
+            values.insert(0, getattr(last, order_by))
+        return encode_cursor(order_by, values)
 
     # https://github.com/tiangolo/sqlmodel/issues/54#issuecomment-907935531
     @typing.no_type_check
-    async def get(self, db: AsyncSession, id: int) -> ModelType | None:
-        result = await db.exec(select(self.model).where(self.model.id == id))
+    async def get(
+        self, db: AsyncSession, id: int, *, options: Sequence[ExecutableOption] = ()
+    ) -> ModelType | None:
+        def build():
+            statement = select(self.model).where(self.model.id == bindparam("id"))
+            if options:
+                statement = statement.options(*options)
+            return statement
+
+        statement = self._cached_statement(("get", tuple(options)), build)
+        result = await db.exec(statement, params={"id": id})
         return result.first()
 
     # https://github.com/tiangolo/sqlmodel/issues/54#issuecomment-907935531
     @typing.no_type_check
     async def get_multi(
-        self, db: AsyncSession, *, offset: int = 0, limit: int = 100
+        self,
+        db: AsyncSession,
+        *,
+        offset: int = 0,
+        limit: int = 100,
+        cursor: str | None = None,
+        order_by: str = "id",
+        options: Sequence[ExecutableOption] = (),
     ) -> list[ModelType]:
-        result = await db.exec(select(self.model).offset(offset).limit(limit))
+        params = self._page_params(
+            offset=offset, limit=limit, cursor=cursor, order_by=order_by
+        )
+        after_cursor, with_offset = "cursor_id" in params, "offset" in params
+
+        def build():
+            statement = self._paginate(
+                select(self.model),
+                order_by=order_by,
+                after_cursor=after_cursor,
+                with_offset=with_offset,
+            )
+            if options:
+                statement = statement.options(*options)
+            return statement
+
+        statement = self._cached_statement(
+            ("get_multi", order_by, after_cursor, with_offset, tuple(options)), build
+        )
+        result = await db.exec(statement, params=params)
         return result.all()
 
+    # https://github.com/tiangolo/sqlmodel/issues/54#issuecomment-907935531
+    @typing.no_type_check
+    async def get_existing_ids(
+        self, db: AsyncSession, *, ids: Sequence[int]
+    ) -> set[int]:
+        """
+        The ids of `ids` that exist, e.g. to check foreign keys before a bulk write.
+        """
+        if not ids:
+            return set()
+        result = await db.exec(select(self.model.id).where(self.model.id.in_(ids)))
+        return set(result)
+
+    async def _estimate_count(self, db: AsyncSession, whereclause: Any) -> int:
+        """
+        Row count estimated by the planner: `pg_class.reltuples` for the whole
+        table, the row estimate of `EXPLAIN` when filtered.
+        """
+        model_table = self.model.__table__  # type: ignore
+        statement = model_table.select()
+        if whereclause is not None:
+            statement = statement.where(whereclause)
+        # Run where the rows would be read from, e.g. a replica
+        bind_arguments = {"clause": statement}
+        dialect = db.get_bind(clause=statement).dialect
+        if whereclause is None:
+            result = await db.execute(
+                text(
+                    "SELECT reltuples::bigint FROM pg_class "
+                    "WHERE oid = CAST(:name AS regclass)"
+                ),
+                {"name": dialect.identifier_preparer.format_table(model_table)},
+                bind_arguments=bind_arguments,
+            )
+            return result.scalar_one()
+        compiled = statement.compile(
+            dialect=dialect, compile_kwargs={"literal_binds": True}
+        )
+        # Colons escaped so that text() does not take casts for bind parameters
+        explain = "EXPLAIN (FORMAT JSON) " + str(compiled).replace(":", "\\:")
+        result = await db.execute(text(explain), bind_arguments=bind_arguments)
+        plan = result.scalar_one()
+        if isinstance(plan, str):
+            plan = json.loads(plan)
+        return int(plan[0]["Plan"]["Plan Rows"])
+
+    async def count(
+        self, db: AsyncSession, *, mode: CountMode = "exact", whereclause: Any = None
+    ) -> int:
+        """
+        Number of rows, optionally filtered by `whereclause`, e.g. to paginate.
+
+        **Parameters**
+
+        * `mode`: `"exact"` runs a `COUNT(*)`, `"estimated"` reads the planner
+          estimate on PostgreSQL (exact for small counts), `"cached"` reuses an
+          exact count for `COUNT_CACHE_TTL_SECONDS`
+        * `whereclause`: Optional filter on the rows
+        """
+        model_table = self.model.__table__  # type: ignore
+        statement = sa_select(func.count()).select_from(model_table)
+        if whereclause is not None:
+            statement = statement.where(whereclause)
+        dialect = db.get_bind(clause=statement).dialect
+        if mode == "estimated" and dialect.name == "postgresql":
+            estimate = await self._estimate_count(db, whereclause)
+            if estimate >= self.count_exact_below:
+                return estimate
+        key = None
+        if mode == "cached":
+            key = str(statement.compile(compile_kwargs={"literal_binds": True}))
+            cached = self.count_cache.get(key)
+            if cached is not None:
+                return cached
+        result = await db.execute(statement)
+        total = result.scalar_one()
+        if key is not None:
+            self.count_cache.set(key, total)
+        return total
+
+    async def stream_rows(
+        self,
+        db: AsyncSession,
+        *,
+        columns: Sequence[str] | None = None,
+        whereclause: Any = None,
+        chunk_size: int = 1000,
+    ) -> AsyncIterator[Sequence[RowMapping]]:
+        """
+        Yield rows as plain column mappings, `chunk_size` rows at a time.
+
+        Rows are read through a server-side cursor and no ORM object is built, so
+        memory stays constant whatever the number of rows.
+
+        **Parameters**
+
+        * `columns`: Names of the columns to read, all of them by default
+        * `whereclause`: Optional filter on the rows
+        * `chunk_size`: Number of rows fetched per round trip
+        """
+        model_table = self.model.__table__  # type: ignore
+        if columns is None:
+            statement = model_table.select()
+        else:
+            statement = model_table.select().with_only_columns(
+                *[model_table.c[name] for name in columns]
+            )
+        if whereclause is not None:
+            statement = statement.where(whereclause)
+        statement = statement.order_by(model_table.c.id).execution_options(
+            max_row_buffer=chunk_size
+        )
+        result = await db.stream(statement)
+        async for partition in result.mappings().partitions(chunk_size):  # type: ignore
+            yield partition
+
     async def create(self, db: AsyncSession, *, obj_in: CreateSchemaType) -> ModelType:
         db_obj = self.model.from_orm(obj_in)
         db.add(db_obj)
@@ -46,7 +380,7 @@ class CRUDBase(Generic[ModelType, CreateSchemaType, UpdateSchemaType]):
         db: AsyncSession,
         *,
         db_obj: ModelType,
-        obj_in: UpdateSchemaType | dict[str, Any]
+        obj_in: UpdateSchemaType | dict[str, Any],
     ) -> ModelType:
         if isinstance(obj_in, dict):
             update_data = obj_in
@@ -64,3 +398,157 @@ class CRUDBase(Generic[ModelType, CreateSchemaType, UpdateSchemaType]):
         await db.delete(db_obj)
         await db.commit()
         return db_obj
+
+    def _from_row(self, row: Row) -> ModelType:
+        return self.model.from_orm(row)
+
+    def _bulk_values(
+        self, obj_in: CreateSchemaType, values: dict[str, Any] | None
+    ) -> dict[str, Any]:
+        db_obj = self.model.from_orm(obj_in, values)
+        return {
+            c.key: getattr(db_obj, c.key)
+            for c in self.model.__table__.columns  # type: ignore
+            if not (c.primary_key and getattr(db_obj, c.key) is None)
+        }
+
+    async def _copy_rows(
+        self, db: AsyncSession, rows: list[dict[str, Any]]
+    ) -> list[ModelType]:
+        """
+        COPY `rows` into a temporary table, then move them into the model table
+        with a single INSERT ... SELECT ... RETURNING.
+        """
+        model_table = self.model.__table__  # type: ignore
+        keys = list(rows[0])
+        tmp_name = f"bulk_{model_table.name}_{uuid.uuid4().hex[:8]}"
+        conn = await db.connection()
+        columns = ", ".join(f'"{k}"' for k in keys)
+        # Only the copied columns, without the id default, which would otherwise
+        # take a second value from the sequence for each row
+        await conn.exec_driver_sql(
+            f'CREATE TEMP TABLE "{tmp_name}" ON COMMIT DROP AS '
+            f'SELECT {columns} FROM "{model_table.name}" WITH NO DATA'
+        )
+        raw_conn = await conn.get_raw_connection()
+        await raw_conn.driver_connection.copy_records_to_table(
+            tmp_name,
+            records=[tuple(row[k] for k in keys) for row in rows],
+            columns=keys,
+        )
+        tmp_table = table(tmp_name, *[column(k) for k in keys])
+        result = await conn.execute(
+            insert(model_table)
+            .from_select(keys, tmp_table.select())
+            .returning(*model_table.columns)
+        )
+        return [self._from_row(row) for row in result]
+
+    async def create_many(
+        self,
+        db: AsyncSession,
+        *,
+        objs_in: Sequence[CreateSchemaType],
+        values: dict[str, Any] | None = None,
+    ) -> list[ModelType]:
+        """
+        Insert all `objs_in` in one transaction and return the created rows.
+
+        Uses multi-row INSERT ... RETURNING, or COPY for at least
+        `bulk_copy_threshold` rows on asyncpg. Returned objects are not attached
+        to the session.
+
+        **Parameters**
+
+        * `objs_in`: The rows to create
+        * `values`: Column values applied to every row, e.g. an owner id
+        """
+        rows = [self._bulk_values(obj_in, values) for obj_in in objs_in]
+        if not rows:
+            return []
+        conn = await db.connection()
+        if len(rows) >= self.bulk_copy_threshold and conn.dialect.driver == "asyncpg":
+            created = await self._copy_rows(db, rows)
+        else:
+            model_table = self.model.__table__  # type: ignore
+            created = []
+            for start in range(0, len(rows), self.bulk_batch_size):
+                result = await db.execute(
+                    insert(model_table)
+                    .values(rows[start : start + self.bulk_batch_size])
+                    .returning(*model_table.columns)
+                )
+                created.extend(self._from_row(row) for row in result)
+        await db.commit()
+        return created
+
+    # https://github.com/tiangolo/sqlmodel/issues/54#issuecomment-907935531
+    @typing.no_type_check
+    async def update_many(
+        self,
+        db: AsyncSession,
+        *,
+        objs_in: dict[int, UpdateSchemaType | dict[str, Any]],
+        options: Sequence[ExecutableOption] = (),
+    ) -> list[ModelType]:
+        """
+        Apply the updates of `objs_in` (keyed by id) in one transaction.
+
+        Rows changing the same set of columns share one executemany UPDATE.
+        """
+        model_table = self.model.__table__
+        version_column = inspect(self.model).version_id_col
+        groups: dict[tuple[str, ...], list[dict[str, Any]]] = defaultdict(list)
+        for id, obj_in in objs_in.items():
+            if isinstance(obj_in, dict):
+                update_data = obj_in
+            else:
+                update_data = obj_in.dict(exclude_unset=True)
+            update_data = {
+                k: v
+                for k, v in update_data.items()
+                if k in model_table.c and not model_table.c[k].primary_key
+            }
+            if update_data:
+                groups[tuple(sorted(update_data))].append({"_id": id, **update_data})
+        for keys, params in groups.items():
+            values = {k: bindparam(k) for k in keys}
+            if version_column is not None:
+                values[version_column.key] = version_column + 1
+            await db.execute(
+                update(model_table)
+                .where(model_table.c.id == bindparam("_id"))
+                .values(values),
+                params,
+            )
+        await db.commit()
+        if not objs_in:
+            return []
+        statement = (
+            select(self.model)
+            .where(self.model.id.in_(list(objs_in)))
+            .order_by(self.model.id)
+            .execution_options(populate_existing=True)
+        )
+        if options:
+            statement = statement.options(*options)
+        result = await db.exec(statement)
+        return result.all()
+
+    async def remove_many(
+        self, db: AsyncSession, *, ids: Sequence[int]
+    ) -> list[ModelType]:
+        """
+        Delete all rows with the given `ids` in one statement and return them.
+        """
+        if not ids:
+            return []
+        model_table = self.model.__table__  # type: ignore
+        result = await db.execute(
+            delete(model_table)
+            .where(model_table.c.id.in_(ids))
+            .returning(*model_table.columns)
+        )
+        removed = [self._from_row(row) for row in result]
+        await db.commit()
+        return removed
@@ -1,10 +1,28 @@
 import typing
+from typing import Any, AsyncIterator, Sequence
 
+from sqlalchemy import bindparam, func, literal_column, tuple_
+from sqlalchemy.dialects.postgresql import TSVECTOR
+from sqlalchemy.engine import RowMapping
+from sqlalchemy.orm import raiseload, selectinload
+from sqlalchemy.sql.base import ExecutableOption
 from sqlmodel import select
 from sqlmodel.ext.asyncio.session import AsyncSession
 
-from app.crud.base import CRUDBase
+from app.crud.base import CountMode, CRUDBase, decode_cursor, encode_cursor
 from app.models.item import Item, ItemCreate, ItemUpdate
+from app.models.user import User
+
+# Items are served with their owner, but never with the owner's own items
+WITH_OWNER: tuple[ExecutableOption, ...] = (
+    selectinload(Item.owner).raiseload(User.items),
+)
+WITHOUT_OWNER: tuple[ExecutableOption, ...] = (raiseload(Item.owner),)
+
+# Generated from title and description by the database, with a GIN index (see
+# the "Add item search" migration). Not mapped on Item, so never loaded.
+SEARCH_CONFIG = literal_column("'english'::regconfig")
+search_vector = literal_column("item.search_vector", type_=TSVECTOR)
 
 
 class CRUDItem(CRUDBase[Item, ItemCreate, ItemUpdate]):
@@ -17,14 +35,147 @@ class CRUDItem(CRUDBase[Item, ItemCreate, ItemUpdate]):
         await db.refresh(db_obj)
         return db_obj
 
+    async def create_many_with_owner(
+        self, db: AsyncSession, *, objs_in: Sequence[ItemCreate], owner_id: int
+    ) -> list[Item]:
+        return await self.create_many(
+            db, objs_in=objs_in, values={"owner_id": owner_id}
+        )
+
+    def stream_rows_by_owner(
+        self,
+        db: AsyncSession,
+        *,
+        owner_id: int,
+        columns: Sequence[str] | None = None,
+        chunk_size: int = 1000,
+    ) -> AsyncIterator[Sequence[RowMapping]]:
+        return self.stream_rows(
+            db,
+            columns=columns,
+            whereclause=Item.owner_id == owner_id,
+            chunk_size=chunk_size,
+        )
+
+    # https://github.com/tiangolo/sqlmodel/issues/54#issuecomment-907935531
+    @typing.no_type_check
+    async def get_owner_ids(
+        self, db: AsyncSession, *, ids: Sequence[int]
+    ) -> dict[int, int]:
+        """
+        Map each existing id of `ids` to the id of its owner.
+        """
+        if not ids:
+            return {}
+        result = await db.exec(select(Item.id, Item.owner_id).where(Item.id.in_(ids)))
+        return {id: owner_id for id, owner_id in result}
+
+    async def count_by_owner(
+        self, db: AsyncSession, *, owner_id: int, mode: CountMode = "exact"
+    ) -> int:
+        return await self.count(db, mode=mode, whereclause=Item.owner_id == owner_id)
+
+    def _search_clause(self, query: str, *, owner_id: int | None = None) -> Any:
+        tsquery = func.websearch_to_tsquery(SEARCH_CONFIG, query)
+        clause = search_vector.op("@@")(tsquery)
+        if owner_id is not None:
+            clause = clause & (Item.owner_id == owner_id)
+        return clause
+
+    async def count_search(
+        self,
+        db: AsyncSession,
+        *,
+        query: str,
+        owner_id: int | None = None,
+        mode: CountMode = "exact",
+    ) -> int:
+        return await self.count(
+            db, mode=mode, whereclause=self._search_clause(query, owner_id=owner_id)
+        )
+
+    # https://github.com/tiangolo/sqlmodel/issues/54#issuecomment-907935531
+    @typing.no_type_check
+    async def search(
+        self,
+        db: AsyncSession,
+        *,
+        query: str,
+        owner_id: int | None = None,
+        offset: int = 0,
+        limit: int = 100,
+        cursor: str | None = None,
+        options: Sequence[ExecutableOption] = (),
+    ) -> tuple[list[Item], str | None]:
+        """
+        Items matching `query`, best matches first, and the cursor of the next
+        page (`None` on the last one).
+
+        `query` uses the web search syntax, e.g. `"exact phrase" -excluded or`.
+
+        **Parameters**
+
+        * `owner_id`: Only search the items of this user
+        * `cursor`: Keyset pagination cursor returned with the previous page
+        """
+        rank = func.ts_rank(
+            search_vector, func.websearch_to_tsquery(SEARCH_CONFIG, query)
+        )
+        statement = (
+            select(Item, rank)
+            .where(self._search_clause(query, owner_id=owner_id))
+            .order_by(rank.desc(), Item.id.desc())
+        )
+        if cursor is not None:
+            values = decode_cursor(cursor, "rank", [float, int])
+            statement = statement.where(tuple_(rank, Item.id) < tuple_(*values))
+        elif offset:
+            statement = statement.offset(offset)
+        statement = statement.limit(limit)
+        if options:
+            statement = statement.options(*options)
+        result = await db.exec(statement)
+        rows = result.all()
+        next_cursor = None
+        if rows and len(rows) == limit:
+            last, last_rank = rows[-1]
+            next_cursor = encode_cursor("rank", [last_rank, last.id])
+        return [item for item, _ in rows], next_cursor
+
     # https://github.com/tiangolo/sqlmodel/issues/54#issuecomment-907935531
     @typing.no_type_check
     async def get_multi_by_owner(
-        self, db: AsyncSession, *, owner_id: int, offset: int = 0, limit: int = 100
+        self,
+        db: AsyncSession,
+        *,
+        owner_id: int,
+        offset: int = 0,
+        limit: int = 100,
+        cursor: str | None = None,
+        order_by: str = "id",
+        options: Sequence[ExecutableOption] = (),
     ) -> list[Item]:
-        result = await db.exec(
-            select(Item).where(Item.owner_id == owner_id).offset(offset).limit(limit)
+        params = self._page_params(
+            offset=offset, limit=limit, cursor=cursor, order_by=order_by
+        )
+        after_cursor, with_offset = "cursor_id" in params, "offset" in params
+
+        def build():
+            statement = self._paginate(
+                select(Item).where(Item.owner_id == bindparam("owner_id")),
+                order_by=order_by,
+                after_cursor=after_cursor,
+                with_offset=with_offset,
+            )
+            if options:
+                statement = statement.options(*options)
+            return statement
+
+        statement = self._cached_statement(
+            ("get_multi_by_owner", order_by, after_cursor, with_offset, tuple(options)),
+            build,
         )
+        result = await db.exec(statement, params={**params, "owner_id": owner_id})
         return result.all()
 
 
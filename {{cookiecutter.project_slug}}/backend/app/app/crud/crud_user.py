@@ -1,24 +1,69 @@
 import typing
-from typing import Any
+from typing import Any, Sequence, cast
 
+from sqlalchemy import bindparam, update
+from sqlalchemy.orm import selectinload
+from sqlalchemy.sql.base import ExecutableOption
 from sqlmodel import select
 from sqlmodel.ext.asyncio.session import AsyncSession
 
-from app.core.security import get_password_hash, verify_password
+from app.core.cache import TTLCache
+from app.core.config import settings
+from app.core.security import get_password_hash_async, verify_password_async
 from app.crud.base import CRUDBase
-from app.models.user import User, UserCreate, UserUpdate
+from app.models.item import Item
+from app.models.user import User, UserCreate, UserPrincipal, UserUpdate
+
+# Users are served with their items, but never with each item's owner again
+WITH_ITEMS: tuple[ExecutableOption, ...] = (
+    selectinload(User.items).raiseload(Item.owner),
+)
+
+# Changing these revokes the access tokens issued before, see `User.token_version`
+TOKEN_CLAIM_FIELDS = {"email", "hashed_password", "is_active", "is_superuser"}
+
+# Principals resolved by the auth dependencies, keyed by user id (token subject)
+principal_cache: TTLCache[int, UserPrincipal] = TTLCache(
+    maxsize=settings.PRINCIPAL_CACHE_SIZE, ttl=settings.PRINCIPAL_CACHE_TTL_SECONDS
+)
 
 
 class CRUDUser(CRUDBase[User, UserCreate, UserUpdate]):
+    # https://github.com/tiangolo/sqlmodel/issues/54#issuecomment-907935531
+    @typing.no_type_check
+    async def get_principal(self, db: AsyncSession, *, id: int) -> UserPrincipal | None:
+        """
+        Load only the columns needed for authorization, skipping `User.items`.
+        """
+        statement = self._cached_statement(
+            "get_principal",
+            lambda: select(
+                User.id,
+                User.email,
+                User.is_active,
+                User.is_superuser,
+                User.token_version,
+            ).where(User.id == bindparam("id")),
+        )
+        result = await db.exec(statement, params={"id": id})
+        row = result.first()
+        if row is None:
+            return None
+        return UserPrincipal(**row._mapping)
+
     # https://github.com/tiangolo/sqlmodel/issues/54#issuecomment-907935531
     @typing.no_type_check
     async def get_by_email(self, db: AsyncSession, *, email: str) -> User | None:
-        result = await db.exec(select(User).filter(User.email == email))
+        statement = self._cached_statement(
+            "get_by_email",
+            lambda: select(User).filter(User.email == bindparam("email")),
+        )
+        result = await db.exec(statement, params={"email": email})
         return result.first()
 
     async def create(self, db: AsyncSession, *, obj_in: UserCreate) -> User:
         db_obj = User.from_orm(
-            obj_in, {"hashed_password": get_password_hash(obj_in.password)}
+            obj_in, {"hashed_password": await get_password_hash_async(obj_in.password)}
         )
         db.add(db_obj)
         await db.commit()
@@ -33,10 +78,58 @@ class CRUDUser(CRUDBase[User, UserCreate, UserUpdate]):
         else:
             update_data = obj_in.dict(exclude_unset=True)
         if update_data.get("password", None):
-            hashed_password = get_password_hash(update_data["password"])
+            hashed_password = await get_password_hash_async(update_data["password"])
             del update_data["password"]
             update_data["hashed_password"] = hashed_password
-        return await super().update(db, db_obj=db_obj, obj_in=update_data)
+        if TOKEN_CLAIM_FIELDS & update_data.keys():
+            update_data["token_version"] = db_obj.token_version + 1
+        user = await super().update(db, db_obj=db_obj, obj_in=update_data)
+        principal_cache.invalidate(cast(int, user.id))
+        return user
+
+    async def remove(self, db: AsyncSession, *, db_obj: User) -> User:
+        user = await super().remove(db, db_obj=db_obj)
+        principal_cache.invalidate(cast(int, user.id))
+        return user
+
+    async def update_many(
+        self,
+        db: AsyncSession,
+        *,
+        objs_in: dict[int, UserUpdate | dict[str, Any]],
+        options: Sequence[ExecutableOption] = (),
+    ) -> list[User]:
+        updates: dict[int, UserUpdate | dict[str, Any]] = {}
+        revoked: list[int] = []
+        for id, obj_in in objs_in.items():
+            if isinstance(obj_in, dict):
+                update_data = dict(obj_in)
+            else:
+                update_data = obj_in.dict(exclude_unset=True)
+            if update_data.get("password", None):
+                update_data["hashed_password"] = await get_password_hash_async(
+                    update_data.pop("password")
+                )
+            if TOKEN_CLAIM_FIELDS & update_data.keys():
+                revoked.append(id)
+            updates[id] = update_data
+        if revoked:
+            # Committed along with the updates by `super().update_many()`
+            await db.execute(
+                update(User)
+                .where(User.id.in_(revoked))  # type: ignore
+                .values(token_version=User.token_version + 1)
+            )
+        users = await super().update_many(db, objs_in=updates, options=options)
+        for id in objs_in:
+            principal_cache.invalidate(id)
+        return users
+
+    async def remove_many(self, db: AsyncSession, *, ids: Sequence[int]) -> list[User]:
+        users = await super().remove_many(db, ids=ids)
+        for id in ids:
+            principal_cache.invalidate(id)
+        return users
 
     async def authenticate(
         self, db: AsyncSession, *, email: str, password: str
@@ -44,14 +137,14 @@ class CRUDUser(CRUDBase[User, UserCreate, UserUpdate]):
         user = await self.get_by_email(db, email=email)
         if not user:
             return None
-        if not verify_password(password, user.hashed_password):
+        if not await verify_password_async(password, user.hashed_password):
             return None
         return user
 
-    def is_active(self, user: User) -> bool:
+    def is_active(self, user: User | UserPrincipal) -> bool:
         return user.is_active
 
-    def is_superuser(self, user: User) -> bool:
+    def is_superuser(self, user: User | UserPrincipal) -> bool:
         return user.is_superuser
 
 
@@ -0,0 +1,132 @@
+import itertools
+import threading
+import time
+from typing import Any
+
+from sqlalchemy.pool import AsyncAdaptedQueuePool, Pool, QueuePool
+
+from app.core import metrics
+
+
+class PoolWaitStats:
+    """
+    Time spent by callers waiting to check a connection out of a pool.
+    """
+
+    # Weight of each checkout in the moving average of `recent_wait_seconds()`
+    recent_weight = 0.2
+    # Seconds after which the moving average halves when nothing is checked out
+    recent_half_life = 5.0
+
+    def __init__(self) -> None:
+        self.checkouts = 0
+        self.wait_seconds_total = 0.0
+        self.wait_seconds_max = 0.0
+        self._recent = 0.0
+        self._recent_at = time.monotonic()
+        self._waiting: dict[int, float] = {}
+        self._tickets = itertools.count()
+        self._lock = threading.Lock()
+
+    def _decayed(self, now: float) -> float:
+        return self._recent * 0.5 ** ((now - self._recent_at) / self.recent_half_life)
+
+    def start_waiting(self) -> int:
+        with self._lock:
+            ticket = next(self._tickets)
+            self._waiting[ticket] = time.monotonic()
+            return ticket
+
+    def record(self, ticket: int, seconds: float) -> None:
+        now = time.monotonic()
+        with self._lock:
+            self._waiting.pop(ticket, None)
+            self.checkouts += 1
+            self.wait_seconds_total += seconds
+            self.wait_seconds_max = max(self.wait_seconds_max, seconds)
+            recent = self._decayed(now)
+            self._recent = recent + (seconds - recent) * self.recent_weight
+            self._recent_at = now
+
+    def recent_wait_seconds(self) -> float:
+        """
+        Moving average of the recent checkout waits, or the wait of the longest
+        waiting caller if greater, so that a stalled pool shows before any of its
+        callers gets a connection.
+        """
+        now = time.monotonic()
+        with self._lock:
+            longest = now - min(self._waiting.values(), default=now)
+            return max(self._decayed(now), longest)
+
+
+class TimedPoolMixin:
+    # Value of the "pool" label of the Prometheus metrics
+    metrics_label: str
+    wait_stats: PoolWaitStats
+
+    def __init__(self, *args: Any, **kwargs: Any):
+        super().__init__(*args, **kwargs)
+        self.wait_stats = PoolWaitStats()
+        if isinstance(self, QueuePool):
+            metrics.DB_POOL_SIZE.labels(self.metrics_label).set(self.size())
+
+    @classmethod
+    def with_metrics_label(cls, label: str) -> type:
+        """
+        Subclass reporting its metrics under `label`, to tell apart several pools
+        of the same kind.
+        """
+        return type(cls.__name__, (cls,), {"metrics_label": label})
+
+    def _update_checked_out(self) -> None:
+        if isinstance(self, QueuePool):
+            checked_out = self.checkedout()
+            metrics.DB_POOL_CHECKED_OUT.labels(self.metrics_label).set(checked_out)
+
+    def _do_get(self) -> Any:
+        ticket = self.wait_stats.start_waiting()
+        start = time.perf_counter()
+        try:
+            return super()._do_get()  # type: ignore
+        finally:
+            wait = time.perf_counter() - start
+            self.wait_stats.record(ticket, wait)
+            metrics.DB_POOL_CHECKOUT_WAIT.labels(self.metrics_label).observe(wait)
+            self._update_checked_out()
+
+    def _do_return_conn(self, record: Any) -> None:
+        super()._do_return_conn(record)  # type: ignore
+        self._update_checked_out()
+
+    def recreate(self) -> Any:
+        # Keep the statistics when the pool is recreated, e.g. by dispose()
+        pool = super().recreate()  # type: ignore
+        pool.wait_stats = self.wait_stats
+        return pool
+
+
+class TimedQueuePool(TimedPoolMixin, QueuePool):
+    metrics_label = "sync"
+
+
+class TimedAsyncAdaptedQueuePool(TimedPoolMixin, AsyncAdaptedQueuePool):
+    metrics_label = "async"
+
+
+def get_pool_status(pool: Pool) -> dict[str, Any]:
+    status: dict[str, Any] = {}
+    if isinstance(pool, QueuePool):
+        status.update(
+            size=pool.size(),
+            checked_out=pool.checkedout(),
+            idle=pool.checkedin(),
+            overflow=max(pool.overflow(), 0),
+        )
+    if isinstance(pool, TimedPoolMixin):
+        status.update(
+            checkouts=pool.wait_stats.checkouts,
+            checkout_wait_seconds_total=pool.wait_stats.wait_seconds_total,
+            checkout_wait_seconds_max=pool.wait_stats.wait_seconds_max,
+        )
+    return status
@@ -0,0 +1,82 @@
+import logging
+import re
+import time
+from collections import Counter
+from contextvars import ContextVar
+from typing import Any, Mapping
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+logger = logging.getLogger("myapp.sqltime")
+
+_placeholders = re.compile(r"(\$\d+|%\(\w+\)s|%s|\?)(\s*,\s*(\$\d+|%\(\w+\)s|%s|\?))*")
+
+
+def statement_shape(statement: str) -> str:
+    # Collapse bind parameter lists, so that "IN ($1, $2)" and "IN ($1)" match
+    return _placeholders.sub("?", " ".join(statement.split()))
+
+
+class QueryStats:
+    """
+    SQL statements executed while serving one request.
+    """
+
+    def __init__(self) -> None:
+        self.count = 0
+        self.total_seconds = 0.0
+        self.slowest_seconds = 0.0
+        self.slowest_statement: str | None = None
+        self.shapes: Counter[str] = Counter()
+
+    def record(self, statement: str, seconds: float) -> None:
+        self.count += 1
+        self.total_seconds += seconds
+        if seconds >= self.slowest_seconds:
+            self.slowest_seconds = seconds
+            self.slowest_statement = statement
+        self.shapes[statement_shape(statement)] += 1
+
+    def repeated(self, threshold: int) -> list[tuple[str, int]]:
+        return [(s, n) for s, n in self.shapes.most_common() if n > threshold]
+
+    def server_timing(self) -> str:
+        return (
+            f'db;dur={self.total_seconds * 1000:.2f};desc="{self.count} queries", '
+            f"db-slowest;dur={self.slowest_seconds * 1000:.2f}"
+        )
+
+
+query_stats: ContextVar[QueryStats | None] = ContextVar("query_stats", default=None)
+
+
+def before_cursor_execute(
+    conn: Any,
+    cursor: Any,
+    statement: str,
+    parameters: Mapping[Any, Any] | None,
+    context: Any | None,
+    executemany: bool,
+) -> None:
+    conn.info.setdefault("query_start_time", []).append(time.perf_counter())
+
+
+def after_cursor_execute(
+    conn: Any,
+    cursor: Any,
+    statement: str,
+    parameters: Mapping[Any, Any] | None,
+    context: Any | None,
+    executemany: bool,
+) -> None:
+    total = time.perf_counter() - conn.info["query_start_time"].pop(-1)
+    logger.debug("Query completed in %f: %s", total, statement)
+    stats = query_stats.get()
+    if stats is not None:
+        stats.record(statement, total)
+
+
+def instrument(engine: Engine) -> None:
+    event.listen(engine, "before_cursor_execute", before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", after_cursor_execute)
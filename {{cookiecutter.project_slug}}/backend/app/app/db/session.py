@@ -1,71 +1,210 @@
 import logging
-import time
+import random
 from contextlib import asynccontextmanager, contextmanager
-from typing import Any, AsyncIterator, Iterator, Mapping
+from contextvars import ContextVar
+from functools import lru_cache
+from typing import Any, AsyncIterator, Iterator
 
-from sqlalchemy import event
+from sqlalchemy.engine import Connection, Engine
+from sqlalchemy.ext.asyncio import AsyncEngine
+from sqlalchemy.ext.asyncio import AsyncSession as _SQLAlchemyAsyncSession
 from sqlalchemy.ext.asyncio import create_async_engine
+from sqlalchemy.sql import ClauseElement, Select
 from sqlmodel import Session as _Session
 from sqlmodel import create_engine
 from sqlmodel.ext.asyncio.session import AsyncSession as _AsyncSession
 
 from app.core.config import settings
+from app.db import profiling
+from app.db.pool import (
+    TimedAsyncAdaptedQueuePool,
+    TimedPoolMixin,
+    TimedQueuePool,
+    get_pool_status,
+)
+
+pool_options: dict[str, Any] = {
+    "pool_size": settings.DB_POOL_SIZE,
+    "max_overflow": settings.DB_MAX_OVERFLOW,
+    "pool_timeout": settings.DB_POOL_TIMEOUT,
+    "pool_recycle": settings.DB_POOL_RECYCLE,
+    "pool_pre_ping": settings.DB_POOL_PRE_PING,
+}
 
-engine = create_engine(str(settings.SQLALCHEMY_DATABASE_URI), pool_pre_ping=True)
+
+# Engines are created on first use rather than on import, so that with a
+# preloaded app each gunicorn worker creates its own pools after the fork
+@lru_cache
+def get_engine() -> Engine:
+    engine = create_engine(
+        str(settings.SQLALCHEMY_DATABASE_URI), poolclass=TimedQueuePool, **pool_options
+    )
+    if settings.PROFILE_QUERY_MODE:
+        profiling.instrument(engine)
+    return engine
 
 
 @contextmanager
 def Session() -> Iterator[_Session]:
-    session = _Session(engine, autoflush=False)
+    session = _Session(get_engine(), autoflush=False)
     try:
         yield session
     finally:
         session.close()
 
 
-engine_async = create_async_engine(
-    str(settings.SQLALCHEMY_DATABASE_URI_ASYNC), pool_pre_ping=True
-)
+def create_async_engine_from_uri(uri: str, poolclass: type) -> AsyncEngine:
+    engine = create_async_engine(
+        uri,
+        poolclass=poolclass,
+        connect_args={
+            "prepared_statement_cache_size": settings.DB_STATEMENT_CACHE_SIZE
+        },
+        **pool_options,
+    )
+    if settings.PROFILE_QUERY_MODE:
+        profiling.instrument(engine.sync_engine)
+    return engine
+
+
+@lru_cache
+def get_engine_async() -> AsyncEngine:
+    return create_async_engine_from_uri(
+        str(settings.SQLALCHEMY_DATABASE_URI_ASYNC), TimedAsyncAdaptedQueuePool
+    )
+
+
+@lru_cache
+def get_replica_engines_async() -> list[AsyncEngine]:
+    return [
+        create_async_engine_from_uri(
+            str(uri), TimedAsyncAdaptedQueuePool.with_metrics_label(f"replica-{i}")
+        )
+        for i, uri in enumerate(settings.SQLALCHEMY_DATABASE_REPLICA_URIS_ASYNC)
+    ]
+
+
+class ReadRouting:
+    """
+    Read routing state of one request: whether its reads must stay on the
+    primary (`sticky`), as for writing requests or clients that just wrote, and
+    whether it wrote to the primary (`wrote`).
+    """
+
+    def __init__(self, *, sticky: bool = False) -> None:
+        self.sticky = sticky
+        self.wrote = False
+
+
+read_routing: ContextVar[ReadRouting | None] = ContextVar("read_routing", default=None)
+
+
+class RoutingSession(_Session):
+    def __init__(self, *args: Any, **kwargs: Any) -> None:
+        """
+        Session sending plain SELECTs to one of the replicas, picked once per
+        session, and everything else to the primary.
+
+        Once the session has written, or when the request is `sticky`, its reads
+        also go to the primary, so that they see its own writes.
+        """
+        super().__init__(*args, **kwargs)
+        self.replica = random.choice(get_replica_engines_async()).sync_engine
+        self.wrote = False
+
+    def get_bind(
+        self,
+        mapper: Any | None = None,
+        clause: ClauseElement | None = None,
+        bind: Connection | Engine | None = None,
+        _sa_skip_events: Any | None = None,
+        _sa_skip_for_implicit_returning: bool = False,
+    ) -> Connection | Engine:
+        routing = read_routing.get()
+        if isinstance(clause, Select) and not self._flushing:  # type: ignore
+            if not (
+                self.wrote
+                or clause._for_update_arg is not None  # type: ignore
+                or (routing and routing.sticky)
+            ):
+                return self.replica
+        else:
+            self.wrote = True
+            if routing:
+                routing.wrote = True
+        return super().get_bind(
+            mapper,
+            clause,
+            bind,
+            _sa_skip_events,
+            _sa_skip_for_implicit_returning,
+        )
+
+
+class RoutingAsyncSession(_AsyncSession):
+    def __init__(self, bind: AsyncEngine, **kwargs: Any) -> None:
+        # SQLModel's AsyncSession always creates a plain Session, so SQLAlchemy's
+        # own __init__ is used, which takes the class of the sync session
+        kwargs["future"] = True
+        _SQLAlchemyAsyncSession.__init__(
+            self, bind, sync_session_class=RoutingSession, **kwargs
+        )
 
 
 @asynccontextmanager
 async def AsyncSession() -> AsyncIterator[_AsyncSession]:
-    session = _AsyncSession(engine_async, autoflush=False, expire_on_commit=False)
+    if settings.SQLALCHEMY_DATABASE_REPLICA_URIS_ASYNC:
+        session_class: type[_AsyncSession] = RoutingAsyncSession
+    else:
+        session_class = _AsyncSession
+    session = session_class(get_engine_async(), autoflush=False, expire_on_commit=False)
     try:
         yield session
     finally:
         await session.close()
 
 
+async def dispose_engines() -> None:
+    """
+    Close the connections of the engines created by this process.
+    """
+    if get_engine.cache_info().currsize:
+        get_engine().dispose()
+    if get_engine_async.cache_info().currsize:
+        await get_engine_async().dispose()
+    if get_replica_engines_async.cache_info().currsize:
+        for replica in get_replica_engines_async():
+            await replica.dispose()
+
+
+def get_pool_wait() -> float:
+    """
+    Recent checkout wait of the most contended async pool, in seconds.
+    """
+    pools = [
+        get_engine_async().pool,
+        *(replica.pool for replica in get_replica_engines_async()),
+    ]
+    return max(
+        (
+            pool.wait_stats.recent_wait_seconds()
+            for pool in pools
+            if isinstance(pool, TimedPoolMixin)
+        ),
+        default=0.0,
+    )
+
+
+def get_pool_metrics() -> dict[str, dict[str, Any]]:
+    metrics = {
+        "async": get_pool_status(get_engine_async().pool),
+        "sync": get_pool_status(get_engine().pool),
+    }
+    for i, replica in enumerate(get_replica_engines_async()):
+        metrics[f"replica-{i}"] = get_pool_status(replica.pool)
+    return metrics
+
+
 if settings.PROFILE_QUERY_MODE:
     logging.basicConfig()
-    logger = logging.getLogger("myapp.sqltime")
-    logger.setLevel(logging.DEBUG)
-
-    def before_cursor_execute(
-        conn: Any,
-        cursor: Any,
-        statement: str,
-        parameters: Mapping[Any, Any] | None,
-        context: Any | None,
-        executemany: bool,
-    ) -> None:
-        conn.info.setdefault("query_start_time", []).append(time.time())
-        logger.debug("Start Query: %s" % statement)
-
-    def after_cursor_execute(
-        conn: Any,
-        cursor: Any,
-        statement: str,
-        parameters: Mapping[Any, Any] | None,
-        context: Any | None,
-        executemany: bool,
-    ) -> None:
-        total = time.time() - conn.info["query_start_time"].pop(-1)
-        logger.debug("Query Complete!")
-        logger.debug("Total Time: %f" % total)
-
-    event.listen(
-        engine_async.sync_engine, "before_cursor_execute", before_cursor_execute
-    )
-    event.listen(engine_async.sync_engine, "after_cursor_execute", after_cursor_execute)
+    logging.getLogger("myapp.sqltime").setLevel(logging.DEBUG)
@@ -0,0 +1,52 @@
+import asyncio
+import logging
+from contextlib import AsyncExitStack
+
+from sqlalchemy.ext.asyncio import AsyncConnection, AsyncEngine
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from app import crud
+
+logger = logging.getLogger(__name__)
+
+
+async def prime_statements(db: AsyncSession) -> None:
+    """
+    Run the queries of the hot endpoints once, so that asyncpg prepares them and
+    introspects their types on the connection of `db`, rather than the first
+    requests doing it.
+
+    Parameters don't change the statements, so ids matching no row are enough.
+    """
+    await crud.user.get_principal(db, id=0)
+    await crud.user.get(db, id=0)
+    await crud.user.get(db, id=0, options=crud.crud_user.WITH_ITEMS)
+    await crud.user.get_by_email(db, email="")
+    await crud.item.get(db, id=0, options=crud.crud_item.WITH_OWNER)
+    await crud.item.get_multi_by_owner(
+        db, owner_id=0, options=crud.crud_item.WITH_OWNER
+    )
+    await crud.item.count_by_owner(db, owner_id=0)
+
+
+async def warm_up_engine(engine: AsyncEngine, connections: int) -> None:
+    """
+    Open `connections` connections of the pool of `engine`, up to its size, and
+    prime the statements of each one.
+    """
+    connections = min(connections, engine.pool.size())  # type: ignore
+
+    async def prime(conn: AsyncConnection) -> None:
+        db = AsyncSession(conn, autoflush=False, expire_on_commit=False)
+        try:
+            await prime_statements(db)
+        finally:
+            await db.close()
+
+    # Hold all the connections at once, so that each one is a different one
+    async with AsyncExitStack() as stack:
+        conns = await asyncio.gather(
+            *(stack.enter_async_context(engine.connect()) for _ in range(connections))
+        )
+        await asyncio.gather(*(prime(conn) for conn in conns))
+    logger.info(f"Opened and primed {connections} database connections")
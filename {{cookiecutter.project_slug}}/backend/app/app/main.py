@@ -1,11 +1,109 @@
-from fastapi import FastAPI
+import asyncio
+import logging
+from contextlib import asynccontextmanager
+from typing import AsyncIterator
+
+from fastapi import FastAPI, Request, Response
+from fastapi.responses import JSONResponse, ORJSONResponse
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm.exc import StaleDataError
 from starlette.middleware.cors import CORSMiddleware
 
 from app.api.api_v1.api import api_router
+from app.core import metrics, security
 from app.core.config import settings
+from app.db.session import (
+    dispose_engines,
+    get_engine_async,
+    get_pool_wait,
+    get_replica_engines_async,
+)
+from app.db.warmup import warm_up_engine
+from app.middleware.load_shedding import LoadSheddingMiddleware
+from app.middleware.metrics import MetricsMiddleware
+from app.middleware.query_profile import QueryProfileMiddleware
+from app.middleware.read_your_writes import ReadYourWritesMiddleware
+
+logger = logging.getLogger(__name__)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI) -> AsyncIterator[None]:
+    if settings.EMAILS_ENABLED:
+        from app.core import mail
+
+        mail.load_templates()
+        mail.mail_queue.start()
+    if settings.DB_POOL_WARMUP_CONNECTIONS > 0:
+        try:
+            for engine in [get_engine_async(), *get_replica_engines_async()]:
+                await warm_up_engine(engine, settings.DB_POOL_WARMUP_CONNECTIONS)
+        except Exception:
+            # The connections will be opened by the first requests instead
+            logger.exception("Failed to warm up the database connection pools")
+    app.state.ready = True
+
+    yield
+
+    # Fail the readiness probe while in-flight requests finish
+    app.state.ready = False
+    if settings.EMAILS_ENABLED:
+        from app.core import mail
+
+        # Waits for the workers to finish delivering, off the event loop
+        await asyncio.to_thread(mail.mail_queue.stop)
+    security.shutdown_password_executor()
+    await dispose_engines()
+
 
 app = FastAPI(
-    title=settings.PROJECT_NAME, openapi_url=f"{settings.API_V1_STR}/openapi.json"
+    title=settings.PROJECT_NAME,
+    openapi_url=f"{settings.API_V1_STR}/openapi.json",
+    default_response_class=ORJSONResponse,
+    lifespan=lifespan,
+)
+app.state.ready = False
+
+
+@app.exception_handler(security.PasswordHashingBusyError)
+async def password_hashing_busy_handler(
+    request: Request, exc: security.PasswordHashingBusyError
+) -> JSONResponse:
+    return JSONResponse(
+        status_code=503, content={"detail": str(exc)}, headers={"Retry-After": "1"}
+    )
+
+
+@app.exception_handler(StaleDataError)
+async def stale_data_handler(request: Request, exc: StaleDataError) -> JSONResponse:
+    # The row was updated or deleted by another request since it was read
+    return JSONResponse(
+        status_code=412,
+        content={"detail": "The resource was modified by another request"},
+    )
+
+
+@app.exception_handler(IntegrityError)
+async def integrity_error_handler(
+    request: Request, exc: IntegrityError
+) -> JSONResponse:
+    # A constraint rejected the write, e.g. a row it references was just deleted.
+    # The transaction is rolled back as a whole, bulk requests included.
+    return JSONResponse(
+        status_code=409,
+        content={"detail": "The request conflicts with the stored data"},
+    )
+
+
+# Added before CORS, so that rejected requests still get the CORS headers
+app.add_middleware(
+    LoadSheddingMiddleware,
+    prefix=settings.API_V1_STR,
+    max_in_flight=settings.LOAD_SHEDDING_MAX_IN_FLIGHT,
+    max_pool_wait=settings.LOAD_SHEDDING_MAX_POOL_WAIT_SECONDS,
+    pool_wait=get_pool_wait,
+    shares=settings.LOAD_SHEDDING_ROUTE_SHARES,
+    retry_after=settings.LOAD_SHEDDING_RETRY_AFTER_SECONDS,
 )
 
 # Set all CORS enabled origins
@@ -16,6 +114,42 @@ if settings.BACKEND_CORS_ORIGINS:
         allow_credentials=True,
         allow_methods=["*"],
         allow_headers=["*"],
+        expose_headers=[
+            "X-Next-Cursor",
+            "X-Total-Count",
+            "Server-Timing",
+            "ETag",
+            "Retry-After",
+        ],
     )
 
+if settings.PROFILE_QUERY_MODE:
+    app.add_middleware(
+        QueryProfileMiddleware,
+        repeat_threshold=settings.PROFILE_QUERY_REPEAT_THRESHOLD,
+    )
+
+if settings.SQLALCHEMY_DATABASE_REPLICA_URIS_ASYNC:
+    app.add_middleware(
+        ReadYourWritesMiddleware, window=settings.DB_READ_YOUR_WRITES_SECONDS
+    )
+
+app.add_middleware(MetricsMiddleware)
+
+
+@app.get("/metrics", include_in_schema=False)
+def read_metrics() -> Response:
+    content, content_type = metrics.generate_metrics()
+    # Passed as a header, as media_type would get a second charset appended
+    return Response(content=content, headers={"Content-Type": content_type})
+
+
+@app.get("/ready", include_in_schema=False)
+def read_ready(request: Request) -> Response:
+    # Readiness probe, outside of the API prefix so that it is never shed
+    if not request.app.state.ready:
+        return Response(status_code=503)
+    return Response("OK")
+
+
 app.include_router(api_router, prefix=settings.API_V1_STR)
@@ -0,0 +1,84 @@
+from typing import Callable
+
+from starlette.responses import JSONResponse
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+from app.core import metrics
+from app.middleware.metrics import get_route_template
+
+
+class LoadSheddingMiddleware:
+    def __init__(
+        self,
+        app: ASGIApp,
+        *,
+        prefix: str,
+        max_in_flight: int,
+        max_pool_wait: float,
+        pool_wait: Callable[[], float],
+        shares: dict[str, float],
+        retry_after: int,
+    ) -> None:
+        """
+        Reject requests with 503 and `Retry-After` while the worker is overloaded,
+        rather than letting them queue for a database connection until they time
+        out, slowing down every other request meanwhile.
+
+        A request is shed when the worker already serves `max_in_flight`
+        requests, or when the recent wait for a database connection exceeds
+        `max_pool_wait`, both scaled by the share of its route.
+
+        **Parameters**
+
+        * `prefix`: Only the requests whose path starts with it are shed, leaving
+          e.g. `/metrics` available
+        * `max_in_flight`: Requests served concurrently, `0` for no limit
+        * `max_pool_wait`: Seconds waited for a connection, `0` for no limit
+        * `pool_wait`: Returns the recent wait for a connection
+        * `shares`: Fraction of the limits from which the requests of a
+          `"METHOD /route/template"`, or else of a `"METHOD"`, are shed, `1` by
+          default: routes with lower shares are shed first
+        * `retry_after`: Seconds sent in the `Retry-After` header
+        """
+        self.app = app
+        self.prefix = prefix
+        self.max_in_flight = max_in_flight
+        self.max_pool_wait = max_pool_wait
+        self.pool_wait = pool_wait
+        self.shares = shares
+        self.retry_after = retry_after
+        self.in_flight = 0
+
+    def get_share(self, method: str, route: str) -> float:
+        share = self.shares.get(f"{method} {route}")
+        if share is None:
+            share = self.shares.get(method, 1.0)
+        return share
+
+    def is_overloaded(self, share: float) -> bool:
+        if self.max_in_flight and self.in_flight >= self.max_in_flight * share:
+            return True
+        if self.max_pool_wait and self.pool_wait() >= self.max_pool_wait * share:
+            return True
+        return False
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or not scope["path"].startswith(self.prefix):
+            await self.app(scope, receive, send)
+            return
+        method = scope["method"]
+        route = get_route_template(scope)
+        if self.is_overloaded(self.get_share(method, route)):
+            metrics.HTTP_REQUESTS_SHED.labels(method, route).inc()
+            response = JSONResponse(
+                status_code=503,
+                content={"detail": "The server is overloaded, retry later"},
+                headers={"Retry-After": str(self.retry_after)},
+            )
+            await response(scope, receive, send)
+            return
+        self.in_flight += 1
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            self.in_flight -= 1
@@ -0,0 +1,52 @@
+import time
+
+from starlette.routing import Match
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.core import metrics
+
+
+def get_route_template(scope: Scope) -> str:
+    """
+    Path template of the route matching the request, e.g. `/api/v1/items/{id}`,
+    so that metric labels stay bounded whatever the ids requested.
+    """
+    for route in scope["app"].router.routes:
+        match, _ = route.matches(scope)
+        if match == Match.FULL:
+            return route.path
+    return "unmatched"
+
+
+class MetricsMiddleware:
+    def __init__(self, app: ASGIApp) -> None:
+        """
+        Record the count, latency and concurrency of HTTP requests per route.
+        """
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        method = scope["method"]
+        route = get_route_template(scope)
+        status = 500
+
+        async def send_with_status(message: Message) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        in_progress = metrics.HTTP_REQUESTS_IN_PROGRESS.labels(method, route)
+        in_progress.inc()
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            metrics.HTTP_REQUEST_DURATION.labels(method, route).observe(
+                time.perf_counter() - start
+            )
+            metrics.HTTP_REQUESTS.labels(method, route, status).inc()
+            in_progress.dec()
@@ -0,0 +1,55 @@
+import logging
+
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.db.profiling import QueryStats, query_stats
+
+logger = logging.getLogger("myapp.sqltime")
+
+
+class QueryProfileMiddleware:
+    def __init__(self, app: ASGIApp, *, repeat_threshold: int) -> None:
+        """
+        Account for the SQL statements run by each request.
+
+        The query count, total database time and slowest statement are sent in a
+        `Server-Timing` header, and a warning is logged when the same statement
+        shape runs more than `repeat_threshold` times, the mark of an N+1 pattern.
+        """
+        self.app = app
+        self.repeat_threshold = repeat_threshold
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        stats = QueryStats()
+        token = query_stats.set(stats)
+
+        async def send_with_timing(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                headers = MutableHeaders(scope=message)
+                headers.append("Server-Timing", stats.server_timing())
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            query_stats.reset(token)
+            request = f"{scope['method']} {scope['path']}"
+            logger.debug(
+                "%s: %d queries in %f, slowest %f: %s",
+                request,
+                stats.count,
+                stats.total_seconds,
+                stats.slowest_seconds,
+                stats.slowest_statement,
+            )
+            for shape, count in stats.repeated(self.repeat_threshold):
+                logger.warning(
+                    "%s ran the same statement %d times (N+1?): %s",
+                    request,
+                    count,
+                    shape,
+                )
@@ -0,0 +1,59 @@
+import time
+from http.cookies import SimpleCookie
+
+from starlette.datastructures import MutableHeaders
+from starlette.requests import HTTPConnection
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.db.session import ReadRouting, read_routing
+
+
+class ReadYourWritesMiddleware:
+    cookie_name = "db_primary_until"
+
+    def __init__(self, app: ASGIApp, *, window: float) -> None:
+        """
+        Keep the reads of a client on the primary database for `window` seconds
+        after it wrote, so that it sees its own writes despite replication lag.
+        Requests other than GET and HEAD read from the primary only.
+
+        The deadline is kept in a cookie rather than in memory, as the next
+        request of the client may be served by another worker.
+        """
+        self.app = app
+        self.window = window
+
+    def is_sticky(self, scope: Scope) -> bool:
+        try:
+            until = float(HTTPConnection(scope).cookies.get(self.cookie_name, 0))
+        except ValueError:
+            return False
+        return until > time.time()
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        # Other methods write, and their reads, such as the lookup of the row to
+        # update or its ETag, must see the latest state of the primary
+        routing = ReadRouting(
+            sticky=scope["method"] not in ("GET", "HEAD") or self.is_sticky(scope)
+        )
+        token = read_routing.set(routing)
+
+        async def send_with_cookie(message: Message) -> None:
+            if message["type"] == "http.response.start" and routing.wrote:
+                cookie: SimpleCookie = SimpleCookie()
+                cookie[self.cookie_name] = str(time.time() + self.window)
+                cookie[self.cookie_name]["max-age"] = int(self.window) + 1
+                cookie[self.cookie_name]["path"] = "/"
+                cookie[self.cookie_name]["httponly"] = True
+                cookie[self.cookie_name]["samesite"] = "lax"
+                headers = MutableHeaders(scope=message)
+                headers.append("Set-Cookie", cookie.output(header="").strip())
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_cookie)
+        finally:
+            read_routing.reset(token)
@@ -0,0 +1,9 @@
+from typing import Any
+
+from sqlmodel import SQLModel
+
+
+# Row of a bulk request that could not be applied
+class BulkError(SQLModel):
+    index: int
+    detail: Any
@@ -1,7 +1,11 @@
-from typing import TYPE_CHECKING
+from typing import TYPE_CHECKING, Any
 
+from sqlalchemy import Index
+from sqlalchemy.orm import declared_attr
 from sqlmodel import Field, Relationship, SQLModel
 
+from .bulk import BulkError
+
 if TYPE_CHECKING:
     from .user import User, UserRead
 
@@ -9,17 +13,26 @@ if TYPE_CHECKING:
 # Shared properties
 class ItemBase(SQLModel):
     title: str = Field(index=True)
-    description: str | None = Field(default=None, index=True)
+    description: str | None = None
     owner_id: int = Field(foreign_key="user.id")
 
 
 # Additional properties stored in DB
 class Item(ItemBase, table=True):
-    id: int | None = Field(default=None, primary_key=True, index=True)
+    # Serves the items of an owner in id order, e.g. for get_multi_by_owner
+    __table_args__ = (Index("ix_item_owner_id_id", "owner_id", "id"),)
+
+    id: int | None = Field(default=None, primary_key=True)
+    # Incremented by every ORM update, which fails if the row changed meanwhile
+    row_version: int = 1
     owner: "User" = Relationship(
         back_populates="items", sa_relationship_kwargs={"lazy": "selectin"}
     )
 
+    @declared_attr
+    def __mapper_args__(cls) -> dict[str, Any]:
+        return {"version_id_col": cls.__table__.c.row_version}  # type: ignore
+
 
 # Properties to receive via API on creation
 class ItemCreate(ItemBase):
@@ -41,3 +54,13 @@ class ItemUpdate(SQLModel):
     title: str | None = None
     description: str | None = None
     owner_id: int | None = None
+
+
+class ItemBulkUpdate(ItemUpdate):
+    id: int
+
+
+# Outcome of a bulk request, errors reference rows by their index in the request
+class ItemBulkResult(SQLModel):
+    items: list[ItemRead] = []
+    errors: list[BulkError] = []
@@ -0,0 +1,12 @@
+from sqlmodel import SQLModel
+
+
+# Live state of a database connection pool of the current worker
+class PoolStatus(SQLModel):
+    size: int
+    checked_out: int
+    idle: int
+    overflow: int
+    checkouts: int
+    checkout_wait_seconds_total: float
+    checkout_wait_seconds_max: float
@@ -8,3 +8,8 @@ class Token(SQLModel):
 
 class TokenPayload(SQLModel):
     sub: int
+    # Claims of the tokens issued with ACCESS_TOKEN_CLAIMS
+    email: str | None = None
+    is_active: bool | None = None
+    is_superuser: bool | None = None
+    token_version: int | None = None
@@ -1,6 +1,7 @@
-from typing import TYPE_CHECKING
+from typing import TYPE_CHECKING, Any
 
 from pydantic import EmailStr
+from sqlalchemy.orm import declared_attr
 from sqlmodel import Field, Relationship, SQLModel
 
 if TYPE_CHECKING:
@@ -17,13 +18,22 @@ class UserBase(SQLModel):
 
 # Additional properties stored in DB
 class User(UserBase, table=True):
-    id: int | None = Field(default=None, primary_key=True, index=True)
+    id: int | None = Field(default=None, primary_key=True)
     hashed_password: str
+    # Incremented by every ORM update, which fails if the row changed meanwhile
+    row_version: int = 1
+    # Incremented when the claims of the user's access tokens change, see
+    # `crud.user.update`, to revoke the tokens carrying the previous ones
+    token_version: int = 0
 
     items: list["Item"] = Relationship(
         back_populates="owner", sa_relationship_kwargs={"lazy": "selectin"}
     )  # XXX: check lazy selectin
 
+    @declared_attr
+    def __mapper_args__(cls) -> dict[str, Any]:
+        return {"version_id_col": cls.__table__.c.row_version}  # type: ignore
+
 
 # Properties to receive via API on creation
 class UserCreate(UserBase):
@@ -39,6 +49,15 @@ class UserReadWithItems(UserRead):
     items: list["ItemRead"] = []
 
 
+# Properties needed to authorize a request, loaded without relationships
+class UserPrincipal(SQLModel):
+    id: int
+    email: EmailStr
+    is_active: bool
+    is_superuser: bool
+    token_version: int
+
+
 # Properties to receive via API on update
 class UserUpdate(SQLModel):
     full_name: str | None = None
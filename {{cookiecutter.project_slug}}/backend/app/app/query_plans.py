@@ -0,0 +1,230 @@
+"""
+Check that the queries of the hot paths are served by indexes.
+
+The database is seeded inside a transaction that is rolled back at the end, so
+run it against a migrated local database. Each CRUD call below is run, every
+statement it issues is EXPLAINed, and the check fails when a plan scans a
+seeded table sequentially or sorts rows.
+"""
+import asyncio
+import json
+import logging
+import sys
+from typing import Any, Awaitable, Callable, NamedTuple
+
+from sqlalchemy import event, text
+from sqlalchemy.ext.asyncio import AsyncConnection
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from app import crud
+from app.crud.base import encode_cursor
+from app.db.session import get_engine_async
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+USERS = 10_000
+ITEMS_PER_USER = 20
+# Items of the sampled user, whose pages are only worth reading in order from an
+# index when they are many: a few rows are cheaper to fetch then sort
+SAMPLE_USER_ITEMS = 5_000
+SAMPLE_USER_EMAIL = "plan-check-42@example.com"
+SEEDED_TABLES = {"user", "item"}
+SORT_NODES = {"Sort", "Incremental Sort"}
+
+
+class Check(NamedTuple):
+    name: str
+    run: Callable[[AsyncSession], Awaitable[Any]]
+    # Ranked results can only be ordered once they are found
+    allow_sort: bool = False
+
+
+async def seed(conn: AsyncConnection) -> dict[str, Any]:
+    await conn.execute(
+        text(
+            'INSERT INTO "user" (email, full_name, hashed_password, is_active, '
+            "is_superuser, row_version) "
+            "SELECT 'plan-check-' || i || '@example.com', 'Plan Check ' || i, '', "
+            "true, false, 1 FROM generate_series(1, :users) AS i"
+        ),
+        {"users": USERS},
+    )
+    await conn.execute(
+        text(
+            "INSERT INTO item (title, description, owner_id, row_version) "
+            "SELECT 'Item ' || substr(md5(u.id || '-' || i), 1, 12), "
+            "'Description of an item', u.id, 1 "
+            'FROM "user" u CROSS JOIN generate_series(1, :items) AS i '
+            "WHERE u.email LIKE 'plan-check-%'"
+        ),
+        {"items": ITEMS_PER_USER},
+    )
+    await conn.execute(
+        text(
+            "INSERT INTO item (title, description, owner_id, row_version) "
+            "SELECT 'Item ' || substr(md5(u.id || '-' || i), 1, 12), "
+            "'Description of an item', u.id, 1 "
+            'FROM "user" u CROSS JOIN '
+            "generate_series(CAST(:first AS integer), CAST(:last AS integer)) AS i "
+            "WHERE u.email = :email"
+        ),
+        {
+            "first": ITEMS_PER_USER + 1,
+            "last": SAMPLE_USER_ITEMS,
+            "email": SAMPLE_USER_EMAIL,
+        },
+    )
+    await conn.execute(text('ANALYZE "user"'))
+    await conn.execute(text("ANALYZE item"))
+    result = await conn.execute(
+        text(
+            'SELECT u.id AS user_id, u.email, i.id AS item_id, i.title FROM "user" u '
+            "JOIN item i ON i.owner_id = u.id "
+            "WHERE u.email = :email ORDER BY i.id LIMIT 1"
+        ),
+        {"email": SAMPLE_USER_EMAIL},
+    )
+    return dict(result.mappings().one())
+
+
+def get_checks(sample: dict[str, Any]) -> list[Check]:
+    user_id, item_id = sample["user_id"], sample["item_id"]
+    user_cursor = encode_cursor("id", [user_id])
+    item_cursor = encode_cursor("id", [item_id])
+    return [
+        Check(
+            "user.get",
+            lambda db: crud.user.get(db, user_id, options=crud.crud_user.WITH_ITEMS),
+        ),
+        Check(
+            "user.get_by_email",
+            lambda db: crud.user.get_by_email(db, email=sample["email"]),
+        ),
+        Check("user.get_principal", lambda db: crud.user.get_principal(db, id=user_id)),
+        Check(
+            "user.get_multi",
+            lambda db: crud.user.get_multi(db, options=crud.crud_user.WITH_ITEMS),
+        ),
+        Check(
+            "user.get_multi with cursor",
+            lambda db: crud.user.get_multi(db, cursor=user_cursor),
+        ),
+        Check(
+            "item.get",
+            lambda db: crud.item.get(db, item_id, options=crud.crud_item.WITH_OWNER),
+        ),
+        Check(
+            "item.get_multi",
+            lambda db: crud.item.get_multi(db, options=crud.crud_item.WITH_OWNER),
+        ),
+        Check(
+            "item.get_multi with cursor",
+            lambda db: crud.item.get_multi(db, cursor=item_cursor),
+        ),
+        Check(
+            "item.get_multi_by_owner",
+            lambda db: crud.item.get_multi_by_owner(
+                db, owner_id=user_id, options=crud.crud_item.WITH_OWNER
+            ),
+        ),
+        Check(
+            "item.get_multi_by_owner with cursor",
+            lambda db: crud.item.get_multi_by_owner(
+                db, owner_id=user_id, cursor=item_cursor
+            ),
+        ),
+        Check(
+            "item.count_by_owner",
+            lambda db: crud.item.count_by_owner(db, owner_id=user_id),
+        ),
+        Check(
+            "item.get_owner_ids",
+            lambda db: crud.item.get_owner_ids(db, ids=[item_id, item_id + 1]),
+        ),
+        Check(
+            "item.search",
+            lambda db: crud.item.search(
+                db, query=sample["title"].split()[-1], owner_id=user_id
+            ),
+            allow_sort=True,
+        ),
+    ]
+
+
+def find_problems(plan: dict[str, Any], *, allow_sort: bool) -> list[str]:
+    problems = []
+    node_type = plan["Node Type"]
+    if node_type == "Seq Scan" and plan.get("Relation Name") in SEEDED_TABLES:
+        problems.append(f"Seq Scan on {plan['Relation Name']}")
+    if node_type in SORT_NODES and not allow_sort:
+        problems.append(f"{node_type} on {', '.join(plan.get('Sort Key', []))}")
+    for child in plan.get("Plans", []):
+        problems.extend(find_problems(child, allow_sort=allow_sort))
+    return problems
+
+
+async def explain(conn: AsyncConnection, statement: str, parameters: Any) -> Any:
+    result = await conn.exec_driver_sql(
+        f"EXPLAIN (FORMAT JSON) {statement}", parameters
+    )
+    plan = result.scalar_one()
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return plan[0]["Plan"]
+
+
+async def main() -> None:
+    statements: list[tuple[str, Any]] = []
+
+    def capture(
+        conn: Any,
+        cursor: Any,
+        statement: str,
+        parameters: Any,
+        context: Any,
+        executemany: bool,
+    ) -> None:
+        if not statement.startswith("EXPLAIN"):
+            statements.append((statement, parameters))
+
+    failed = []
+    engine = get_engine_async()
+    async with engine.connect() as conn:
+        transaction = await conn.begin()
+        try:
+            logger.info(
+                f"Seeding {USERS} users with {ITEMS_PER_USER} items each, and "
+                f"{SAMPLE_USER_ITEMS} for {SAMPLE_USER_EMAIL}"
+            )
+            sample = await seed(conn)
+            db = AsyncSession(conn, autoflush=False, expire_on_commit=False)
+            event.listen(engine.sync_engine, "before_cursor_execute", capture)
+            for check in get_checks(sample):
+                statements.clear()
+                await check.run(db)
+                db.expunge_all()
+                for statement, parameters in list(statements):
+                    plan = await explain(conn, statement, parameters)
+                    problems = find_problems(plan, allow_sort=check.allow_sort)
+                    if problems:
+                        failed.append(check.name)
+                        logger.error(
+                            f"{check.name}: {'; '.join(problems)}\n{statement}\n"
+                            f"{json.dumps(plan, indent=2)}"
+                        )
+                if check.name not in failed:
+                    logger.info(f"{check.name}: OK")
+        finally:
+            # Not listening yet if seeding failed
+            if event.contains(engine.sync_engine, "before_cursor_execute", capture):
+                event.remove(engine.sync_engine, "before_cursor_execute", capture)
+            await transaction.rollback()
+    await engine.dispose()
+    if failed:
+        logger.error(f"{len(failed)} queries are not served by indexes")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
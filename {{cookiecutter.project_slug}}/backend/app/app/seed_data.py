@@ -0,0 +1,210 @@
+"""
+Load synthetic users and items, for benchmarks and query plans on realistic
+volumes.
+
+Rows are written with COPY in batches spread over `--jobs` connections. Item
+owners follow a Zipf distribution (`--skew`), so a few users own most of the
+items as in production. Users get one of `--passwords` distinct passwords,
+`seed-password-<n>`, each hashed once for the whole run.
+
+Seeded users are numbered after the ones already present, so the command can
+be run again to grow the data set:
+python app/seed_data.py --users 100000 --items 10000000
+"""
+import argparse
+import asyncio
+import itertools
+import logging
+import random
+import time
+from typing import Any, Iterator, Sequence
+
+from sqlalchemy import text
+
+from app.core.security import get_password_hash
+from app.db.session import get_engine_async
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+EMAIL_DOMAIN = "seed.example.com"
+WORDS = (
+    "alpha amber apple autumn breeze bright cedar cloud copper coral crimson "
+    "crystal dawn delta desert ember falcon forest frost garden glacier golden "
+    "harbor hazel horizon island ivory jade lagoon lantern lemon maple meadow "
+    "midnight mint misty ocean olive orchid pearl pepper pine plum quartz rain "
+    "river ruby sage silver slate spruce stone storm summer sunset thunder "
+    "timber velvet violet willow winter"
+).split()
+
+USER_COLUMNS = [
+    "email",
+    "full_name",
+    "hashed_password",
+    "is_active",
+    "is_superuser",
+    "row_version",
+]
+ITEM_COLUMNS = ["title", "description", "owner_id", "row_version"]
+
+
+def batches(total: int, size: int) -> Iterator[tuple[int, int]]:
+    for start in range(0, total, size):
+        yield start, min(size, total - start)
+
+
+def user_rows(
+    first: int, count: int, hashed_passwords: Sequence[str]
+) -> list[tuple[Any, ...]]:
+    return [
+        (
+            f"user-{n}@{EMAIL_DOMAIN}",
+            f"Seed User {n}",
+            hashed_passwords[n % len(hashed_passwords)],
+            True,
+            False,
+            1,
+        )
+        for n in range(first, first + count)
+    ]
+
+
+def item_rows(
+    rng: random.Random,
+    count: int,
+    owner_ids: Sequence[int],
+    cum_weights: Sequence[float],
+) -> list[tuple[Any, ...]]:
+    owners = rng.choices(owner_ids, cum_weights=cum_weights, k=count)
+    return [
+        (
+            " ".join(rng.choices(WORDS, k=3)).capitalize(),
+            # Leave some descriptions empty, as users do
+            " ".join(rng.choices(WORDS, k=12)) if rng.random() < 0.8 else None,
+            owner_id,
+            1,
+        )
+        for owner_id in owners
+    ]
+
+
+async def copy_batches(
+    table: str,
+    columns: list[str],
+    jobs: int,
+    work: Iterator[tuple[int, int]],
+    make_rows: Any,
+) -> int:
+    """
+    COPY the rows made by `make_rows(start, count)` for each batch of `work`,
+    from `jobs` concurrent connections, in one transaction per batch.
+    """
+    copied = 0
+
+    async def worker() -> None:
+        nonlocal copied
+        async with get_engine_async().connect() as conn:
+            for start, count in work:
+                # Built in a thread, while the other connections are copying
+                rows = await asyncio.to_thread(make_rows, start, count)
+                # Each batch is only worth redoing, not waiting on the WAL for.
+                # This also begins the transaction, which SQLAlchemy's asyncpg
+                # adapter holds: the COPY runs in it and `commit()` ends it.
+                await conn.exec_driver_sql("SET LOCAL synchronous_commit = off")
+                raw = await conn.get_raw_connection()
+                await raw.driver_connection.copy_records_to_table(
+                    table, records=rows, columns=columns
+                )
+                await conn.commit()
+                copied += count
+                logger.info(f"{table}: {copied} rows copied")
+
+    # The workers share the `work` iterator, each taking the next batch when done
+    await asyncio.gather(*(worker() for _ in range(jobs)))
+    return copied
+
+
+async def seed(args: argparse.Namespace) -> None:
+    async with get_engine_async().connect() as conn:
+        first = await conn.scalar(
+            text('SELECT count(*) FROM "user" WHERE email LIKE :pattern'),
+            {"pattern": f"%@{EMAIL_DOMAIN}"},
+        )
+
+    start = time.perf_counter()
+    hashed_passwords = [
+        get_password_hash(f"seed-password-{n}") for n in range(args.passwords)
+    ]
+    await copy_batches(
+        "user",
+        USER_COLUMNS,
+        args.jobs,
+        batches(args.users, args.batch_size),
+        lambda offset, count: user_rows(first + offset, count, hashed_passwords),
+    )
+    logger.info(f"{args.users} users loaded in {time.perf_counter() - start:.1f}s")
+
+    if args.items:
+        async with get_engine_async().connect() as conn:
+            result = await conn.execute(
+                text('SELECT id FROM "user" WHERE email LIKE :pattern ORDER BY id'),
+                {"pattern": f"%@{EMAIL_DOMAIN}"},
+            )
+            owner_ids = result.scalars().all()
+        if not owner_ids:
+            raise RuntimeError("No seeded user to own the items, set --users")
+        # Heavy owners are spread over the ids rather than being the first ones
+        random.Random(args.random_seed).shuffle(owner_ids)
+        cum_weights = list(
+            itertools.accumulate(
+                1 / rank**args.skew for rank in range(1, len(owner_ids) + 1)
+            )
+        )
+        start = time.perf_counter()
+        await copy_batches(
+            "item",
+            ITEM_COLUMNS,
+            args.jobs,
+            batches(args.items, args.batch_size),
+            # Batches are made concurrently, each from its own generator so that
+            # the rows only depend on the seed
+            lambda offset, count: item_rows(
+                random.Random(f"{args.random_seed}-{offset}"),
+                count,
+                owner_ids,
+                cum_weights,
+            ),
+        )
+        logger.info(f"{args.items} items loaded in {time.perf_counter() - start:.1f}s")
+
+    async with get_engine_async().connect() as conn:
+        await conn.execute(text('ANALYZE "user"'))
+        await conn.execute(text("ANALYZE item"))
+        await conn.commit()
+    await get_engine_async().dispose()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--users", type=int, default=10_000)
+    parser.add_argument("--items", type=int, default=1_000_000)
+    parser.add_argument(
+        "--skew", type=float, default=1.1, help="Zipf exponent of items per owner"
+    )
+    parser.add_argument("--passwords", type=int, default=1, help="distinct ones")
+    parser.add_argument("--batch-size", type=int, default=50_000)
+    parser.add_argument("--jobs", type=int, default=4, help="parallel connections")
+    parser.add_argument("--random-seed", type=int, default=0)
+    args = parser.parse_args()
+    if args.passwords < 1:
+        parser.error("--passwords must be at least 1")
+    if args.jobs < 1:
+        parser.error("--jobs must be at least 1")
+
+    logger.info("Seeding data")
+    asyncio.run(seed(args))
+    logger.info("Data seeded")
+
+
+if __name__ == "__main__":
+    main()
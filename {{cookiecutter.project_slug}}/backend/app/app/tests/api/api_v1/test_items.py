@@ -0,0 +1,170 @@
+import json
+
+from fastapi.testclient import TestClient
+
+from app.core.config import settings
+from app.crud.base import CRUDBase
+from app.models import User
+from app.tests.utils.item import create_random_items, get_item
+from app.tests.utils.utils import Run
+
+BULK_URL = f"{settings.API_V1_STR}/items/bulk"
+# Larger than any id of the tests
+MISSING_ID = 2**31 - 1
+
+
+def test_create_items_bulk(
+    client: TestClient, normal_user: tuple[User, dict[str, str]], other_user: User
+) -> None:
+    user, headers = normal_user
+    r = client.post(
+        BULK_URL,
+        headers=headers,
+        json=[
+            {"title": "First"},
+            {"description": "No title"},
+            # Items are always created for the current user
+            {"title": "Second", "owner_id": other_user.id},
+        ],
+    )
+    assert r.status_code == 200
+    result = r.json()
+    assert [(item["title"], item["owner_id"]) for item in result["items"]] == [
+        ("First", user.id),
+        ("Second", user.id),
+    ]
+    assert len(result["errors"]) == 1
+    assert result["errors"][0]["index"] == 1
+    assert result["errors"][0]["detail"][0]["loc"] == ["title"]
+
+
+def test_create_items_bulk_copy(
+    client: TestClient, normal_user: tuple[User, dict[str, str]]
+) -> None:
+    user, headers = normal_user
+    count = CRUDBase.bulk_copy_threshold
+    r = client.post(
+        BULK_URL, headers=headers, json=[{"title": f"Item {i}"} for i in range(count)]
+    )
+    assert r.status_code == 200
+    items = r.json()["items"]
+    assert [item["title"] for item in items] == [f"Item {i}" for i in range(count)]
+    assert {item["owner_id"] for item in items} == {user.id}
+    # Each row takes a single value from the id sequence
+    ids = [item["id"] for item in items]
+    assert ids == list(range(ids[0], ids[0] + count))
+
+
+def test_update_items_bulk(
+    client: TestClient,
+    run: Run,
+    normal_user: tuple[User, dict[str, str]],
+    other_user: User,
+) -> None:
+    user, headers = normal_user
+    own, moved = run(create_random_items, user.id, 2)
+    (others,) = run(create_random_items, other_user.id, 1)
+    r = client.patch(
+        BULK_URL,
+        headers=headers,
+        json=[
+            {"id": own.id, "title": "Updated"},
+            {"id": others.id, "title": "Not mine"},
+            {"id": MISSING_ID, "title": "Missing"},
+            {"id": moved.id, "owner_id": MISSING_ID},
+            {"title": "No id"},
+        ],
+    )
+    assert r.status_code == 200
+    result = r.json()
+    assert [(item["id"], item["title"]) for item in result["items"]] == [
+        (own.id, "Updated")
+    ]
+    errors = sorted(result["errors"], key=lambda error: error["index"])
+    assert [error["index"] for error in errors] == [1, 2, 3, 4]
+    assert errors[0]["detail"] == "Not enough permissions"
+    assert errors[1]["detail"] == "Item not found"
+    assert errors[2]["detail"] == "Owner not found"
+    assert errors[3]["detail"][0]["loc"] == ["id"]
+
+    updated = run(get_item, own.id)
+    assert (updated.title, updated.row_version) == ("Updated", own.row_version + 1)
+    not_moved = run(get_item, moved.id)
+    assert (not_moved.owner_id, not_moved.row_version) == (user.id, moved.row_version)
+    untouched = run(get_item, others.id)
+    assert (untouched.title, untouched.row_version) == (
+        others.title,
+        others.row_version,
+    )
+
+
+def test_update_items_bulk_conflict(
+    client: TestClient, run: Run, normal_user: tuple[User, dict[str, str]]
+) -> None:
+    user, headers = normal_user
+    first, second = run(create_random_items, user.id, 2)
+    r = client.patch(
+        BULK_URL,
+        headers=headers,
+        json=[{"id": first.id, "title": "Updated"}, {"id": second.id, "title": None}],
+    )
+    # The title is not nullable, and the whole request is rolled back
+    assert r.status_code == 409
+    assert run(get_item, first.id).title == first.title
+
+
+def test_delete_items_bulk(
+    client: TestClient,
+    run: Run,
+    normal_user: tuple[User, dict[str, str]],
+    other_user: User,
+) -> None:
+    user, headers = normal_user
+    (own,) = run(create_random_items, user.id, 1)
+    (others,) = run(create_random_items, other_user.id, 1)
+    r = client.request(
+        "DELETE", BULK_URL, headers=headers, json=[own.id, others.id, MISSING_ID]
+    )
+    assert r.status_code == 200
+    result = r.json()
+    assert [item["id"] for item in result["items"]] == [own.id]
+    assert result["errors"] == [
+        {"index": 1, "detail": "Not enough permissions"},
+        {"index": 2, "detail": "Item not found"},
+    ]
+    assert run(get_item, own.id) is None
+    assert run(get_item, others.id) is not None
+
+
+def test_delete_items_bulk_superuser(
+    client: TestClient,
+    run: Run,
+    superuser_token_headers: dict[str, str],
+    other_user: User,
+) -> None:
+    (others,) = run(create_random_items, other_user.id, 1)
+    r = client.request(
+        "DELETE", BULK_URL, headers=superuser_token_headers, json=[others.id]
+    )
+    assert r.status_code == 200
+    assert r.json() == {"items": [r.json()["items"][0]], "errors": []}
+    assert run(get_item, others.id) is None
+
+
+def test_export_items_ndjson(
+    client: TestClient, run: Run, normal_user: tuple[User, dict[str, str]]
+) -> None:
+    user, headers = normal_user
+    items = run(create_random_items, user.id, 3)
+    r = client.get(f"{settings.API_V1_STR}/items/export", headers=headers)
+    assert r.status_code == 200
+    assert r.headers["content-type"] == "application/x-ndjson"
+    assert [json.loads(line) for line in r.text.splitlines()] == [
+        {
+            "id": item.id,
+            "title": item.title,
+            "description": None,
+            "owner_id": user.id,
+        }
+        for item in items
+    ]
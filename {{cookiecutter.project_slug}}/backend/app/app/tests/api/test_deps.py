@@ -0,0 +1,63 @@
+from typing import Any, Iterator
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import update
+
+from app.core.config import settings
+from app.db.session import AsyncSession
+from app.models import User
+from app.tests.utils.user import create_random_user, delete_user
+from app.tests.utils.utils import Run, login_headers
+
+ITEMS_URL = f"{settings.API_V1_STR}/items/"
+
+
+async def update_user_row(id: int, values: dict[str, Any]) -> None:
+    # As another worker would, leaving the principal cache of this one stale
+    async with AsyncSession() as db:
+        await db.execute(update(User).where(User.id == id).values(**values))
+        await db.commit()
+
+
+@pytest.fixture
+def user(run: Run) -> Iterator[tuple[User, str]]:
+    user, password = run(create_random_user)
+    yield user, password
+    run(delete_user, user.id)
+
+
+def create_item(client: TestClient, user: User, headers: dict[str, str]) -> int:
+    item = {"title": "Revoked?", "owner_id": user.id}
+    return client.post(ITEMS_URL, headers=headers, json=item).status_code
+
+
+def test_deactivated_user_cannot_write_from_cache(
+    client: TestClient, run: Run, user: tuple[User, str]
+) -> None:
+    db_user, password = user
+    headers = login_headers(client, email=db_user.email, password=password)
+    # Caches the principal
+    assert client.get(ITEMS_URL, headers=headers).status_code == 200
+    run(update_user_row, db_user.id, {"is_active": False})
+    assert create_item(client, db_user, headers) == 400
+
+
+def test_revoked_claims_token_cannot_write(
+    client: TestClient,
+    run: Run,
+    user: tuple[User, str],
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    monkeypatch.setattr(settings, "ACCESS_TOKEN_CLAIMS", True)
+    db_user, password = user
+    headers = login_headers(client, email=db_user.email, password=password)
+    assert create_item(client, db_user, headers) == 200
+    run(
+        update_user_row,
+        db_user.id,
+        {"token_version": db_user.token_version + 1, "is_active": False},
+    )
+    assert create_item(client, db_user, headers) == 403
+    # Reads trust the claims until the token expires
+    assert client.get(ITEMS_URL, headers=headers).status_code == 200
@@ -0,0 +1,34 @@
+import pytest
+from fastapi import HTTPException, Request
+
+from app.api.etag import check_if_match, is_not_modified
+
+ETAG = '"0123456789abcdef"'
+
+
+def make_request(name: str, value: str) -> Request:
+    return Request({"type": "http", "headers": [(name.encode(), value.encode())]})
+
+
+@pytest.mark.parametrize("header", [ETAG, f"W/{ETAG}", f'"other", {ETAG}', "*"])
+def test_if_none_match_weak_comparison(header: str) -> None:
+    assert is_not_modified(make_request("if-none-match", header), ETAG)
+
+
+def test_if_none_match_other_etag() -> None:
+    assert not is_not_modified(make_request("if-none-match", '"other"'), ETAG)
+
+
+@pytest.mark.parametrize("header", [ETAG, f'"other", {ETAG}', "*"])
+def test_if_match(header: str) -> None:
+    check_if_match(make_request("if-match", header), ETAG)
+
+
+@pytest.mark.parametrize("header", ['"other"', f"W/{ETAG}", f'W/"other", W/{ETAG}'])
+def test_if_match_strong_comparison(header: str) -> None:
+    try:
+        check_if_match(make_request("if-match", header), ETAG)
+    except HTTPException as e:
+        assert e.status_code == 412
+    else:
+        pytest.fail("If-Match did not fail")
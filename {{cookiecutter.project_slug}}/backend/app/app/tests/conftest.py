@@ -0,0 +1,61 @@
+from typing import Any, Awaitable, Callable, Iterator
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy.exc import OperationalError
+
+from app.db.session import get_engine
+from app.main import app
+from app.models import User
+from app.tests.utils.user import create_random_user, delete_user
+from app.tests.utils.utils import Run, get_superuser_token_headers, login_headers
+
+
+@pytest.fixture(scope="session")
+def client() -> Iterator[TestClient]:
+    try:
+        with get_engine().connect():
+            pass
+    except OperationalError:
+        pytest.skip("The database is not reachable")
+    finally:
+        get_engine().dispose()
+    with TestClient(app) as c:
+        yield c
+
+
+@pytest.fixture(scope="session")
+def run(client: TestClient) -> Run:
+    """
+    Run an async function on the event loop of the app, to which the connections
+    of its pools are bound.
+    """
+
+    def run(func: Callable[..., Awaitable[Any]], *args: Any) -> Any:
+        assert client.portal
+        return client.portal.call(func, *args)
+
+    return run
+
+
+@pytest.fixture(scope="session")
+def superuser_token_headers(client: TestClient) -> dict[str, str]:
+    return get_superuser_token_headers(client)
+
+
+@pytest.fixture
+def normal_user(client: TestClient, run: Run) -> Iterator[tuple[User, dict[str, str]]]:
+    """
+    A new user with the headers of its access token, deleted along with its items
+    after the test.
+    """
+    user, password = run(create_random_user)
+    yield user, login_headers(client, email=user.email, password=password)
+    run(delete_user, user.id)
+
+
+@pytest.fixture
+def other_user(run: Run) -> Iterator[User]:
+    user, _ = run(create_random_user)
+    yield user
+    run(delete_user, user.id)
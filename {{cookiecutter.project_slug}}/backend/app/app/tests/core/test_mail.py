@@ -0,0 +1,98 @@
+import threading
+import time
+from typing import Any, Iterator
+
+import pytest
+
+from app.core import mail
+
+
+class DroppedConnectionBackend:
+    def close(self) -> None:
+        raise ConnectionResetError("Connection reset by peer")
+
+
+@pytest.fixture
+def mail_queue(monkeypatch: pytest.MonkeyPatch) -> Iterator[mail.MailQueue]:
+    monkeypatch.setattr(mail, "get_smtp_backend", DroppedConnectionBackend)
+    mail_queue = mail.MailQueue(workers=1, max_retries=2, retry_backoff=0.01)
+    yield mail_queue
+    mail_queue.stop(timeout=1)
+
+
+def make_job(email_to: str) -> mail.EmailJob:
+    return mail.EmailJob(
+        email_to=email_to, subject="", html_template=None, environment={}
+    )
+
+
+def test_retry_when_close_fails(
+    mail_queue: mail.MailQueue, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    attempts: list[tuple[str, int]] = []
+    delivered = threading.Event()
+
+    def deliver(backend: Any, job: mail.EmailJob) -> None:
+        attempts.append((job.email_to, job.attempt))
+        if job.attempt == 0:
+            raise ConnectionResetError("Connection reset by peer")
+        delivered.set()
+
+    monkeypatch.setattr(mail_queue, "_deliver", deliver)
+    mail_queue.enqueue(make_job("first@example.com"))
+    assert delivered.wait(timeout=5)
+    delivered.clear()
+    # The worker survived, and delivers the next emails
+    mail_queue.enqueue(make_job("second@example.com"))
+    assert delivered.wait(timeout=5)
+    assert attempts == [
+        ("first@example.com", 0),
+        ("first@example.com", 1),
+        ("second@example.com", 0),
+        ("second@example.com", 1),
+    ]
+    assert all(thread.is_alive() for thread in mail_queue._threads)
+
+
+def test_worker_survives_retry_error(
+    mail_queue: mail.MailQueue, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    delivered = threading.Event()
+
+    def deliver(backend: Any, job: mail.EmailJob) -> None:
+        if job.email_to == "broken@example.com":
+            raise ConnectionResetError("Connection reset by peer")
+        delivered.set()
+
+    def retry(job: mail.EmailJob) -> None:
+        raise RuntimeError("can't start new thread")
+
+    monkeypatch.setattr(mail_queue, "_deliver", deliver)
+    monkeypatch.setattr(mail_queue, "_retry", retry)
+    mail_queue.enqueue(make_job("broken@example.com"))
+    mail_queue.enqueue(make_job("next@example.com"))
+    assert delivered.wait(timeout=5)
+
+
+def test_stop_drops_pending_retries(
+    mail_queue: mail.MailQueue,
+    monkeypatch: pytest.MonkeyPatch,
+    caplog: pytest.LogCaptureFixture,
+) -> None:
+    attempts: list[int] = []
+    failed = threading.Event()
+
+    def deliver(backend: Any, job: mail.EmailJob) -> None:
+        attempts.append(job.attempt)
+        failed.set()
+        raise ConnectionResetError("Connection reset by peer")
+
+    monkeypatch.setattr(mail_queue, "_deliver", deliver)
+    mail_queue.retry_backoff = 0.5
+    mail_queue.enqueue(make_job("first@example.com"))
+    assert failed.wait(timeout=5)
+    time.sleep(0.05)  # leaves the worker the time to schedule the retry
+    mail_queue.stop(timeout=1)
+    time.sleep(0.6)
+    assert attempts == [0]
+    assert "Dropping email to first@example.com on shutdown" in caplog.text
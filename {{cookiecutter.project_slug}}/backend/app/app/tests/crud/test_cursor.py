@@ -0,0 +1,60 @@
+import base64
+import json
+from typing import Any
+
+import pytest
+
+from app import crud
+from app.crud.base import InvalidCursorError, decode_cursor, encode_cursor
+
+
+def forge_cursor(payload: Any) -> str:
+    raw = json.dumps(payload).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def test_cursor_round_trip() -> None:
+    cursor = encode_cursor("email", ["user@example.com", 42])
+    assert decode_cursor(cursor, "email", [str, int]) == ["user@example.com", 42]
+
+
+@pytest.mark.parametrize(
+    "cursor",
+    [
+        "not a cursor",
+        forge_cursor(["x"]),
+        forge_cursor({"o": "email", "k": [42]}),
+        forge_cursor({"o": "id", "k": [1, 2]}),
+        forge_cursor({"o": "id", "k": ["x"]}),
+        forge_cursor({"o": "id", "k": [None]}),
+        forge_cursor({"o": "id", "k": [True]}),
+        forge_cursor({"o": "id", "k": [1.5]}),
+    ],
+)
+def test_invalid_id_cursor(cursor: str) -> None:
+    with pytest.raises(InvalidCursorError):
+        crud.item._page_params(cursor=cursor)
+
+
+@pytest.mark.parametrize(
+    "key", [[None, 1], [1, 1], ["a", "1"], ["a", None], [["a"], 1]]
+)
+def test_invalid_title_cursor(key: list[Any]) -> None:
+    cursor = forge_cursor({"o": "title", "k": key})
+    with pytest.raises(InvalidCursorError):
+        crud.item._page_params(cursor=cursor, order_by="title")
+
+
+def test_page_params() -> None:
+    cursor = encode_cursor("title", ["a", 1])
+    assert crud.item._page_params(cursor=cursor, order_by="title", limit=10) == {
+        "limit": 10,
+        "cursor_key": "a",
+        "cursor_id": 1,
+    }
+    assert crud.item._page_params(offset=20) == {"limit": 100, "offset": 20}
+
+
+def test_search_cursor_accepts_integral_rank() -> None:
+    cursor = forge_cursor({"o": "rank", "k": [1, 7]})
+    assert decode_cursor(cursor, "rank", [float, int]) == [1, 7]
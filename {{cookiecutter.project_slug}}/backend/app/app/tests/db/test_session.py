@@ -0,0 +1,69 @@
+from types import SimpleNamespace
+from typing import Iterator
+
+import pytest
+from sqlalchemy import create_engine, insert
+from sqlalchemy.engine import Engine
+from sqlmodel import select
+
+from app.db import session
+from app.db.session import ReadRouting, RoutingSession, read_routing
+from app.models import Item
+
+# Engines are only bound to, never connected to
+primary = create_engine("sqlite://")
+replica = create_engine("sqlite://")
+
+
+@pytest.fixture
+def routing_session(monkeypatch: pytest.MonkeyPatch) -> Iterator[RoutingSession]:
+    monkeypatch.setattr(
+        session,
+        "get_replica_engines_async",
+        lambda: [SimpleNamespace(sync_engine=replica)],
+    )
+    with RoutingSession(bind=primary) as db:
+        yield db
+
+
+def get_bind(db: RoutingSession, statement: object) -> Engine:
+    return db.get_bind(clause=statement)  # type: ignore
+
+
+def test_select_goes_to_replica(routing_session: RoutingSession) -> None:
+    assert get_bind(routing_session, select(Item)) is replica
+    assert not routing_session.wrote
+
+
+def test_writes_go_to_primary(routing_session: RoutingSession) -> None:
+    assert get_bind(routing_session, insert(Item.__table__)) is primary  # type: ignore
+    # And so do the reads that follow, which must see the write
+    assert get_bind(routing_session, select(Item)) is primary
+
+
+def test_select_while_flushing_goes_to_primary(
+    routing_session: RoutingSession,
+) -> None:
+    routing_session._flushing = True  # type: ignore
+    assert get_bind(routing_session, select(Item)) is primary
+    routing_session._flushing = False  # type: ignore
+    assert get_bind(routing_session, select(Item)) is primary
+
+
+def test_select_for_update_goes_to_primary(routing_session: RoutingSession) -> None:
+    assert get_bind(routing_session, select(Item).with_for_update()) is primary
+    assert get_bind(routing_session, select(Item)) is replica
+
+
+@pytest.mark.parametrize("sticky", [False, True])
+def test_request_routing(routing_session: RoutingSession, sticky: bool) -> None:
+    routing = ReadRouting(sticky=sticky)
+    token = read_routing.set(routing)
+    try:
+        bind = get_bind(routing_session, select(Item))
+        assert bind is (primary if sticky else replica)
+        assert not routing.wrote
+        get_bind(routing_session, insert(Item.__table__))  # type: ignore
+        assert routing.wrote
+    finally:
+        read_routing.reset(token)
@@ -0,0 +1,115 @@
+from typing import Iterator
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.core import metrics
+from app.middleware.load_shedding import LoadSheddingMiddleware
+
+pool_wait = 0.0
+
+
+def create_app() -> FastAPI:
+    app = FastAPI()
+    app.add_middleware(
+        LoadSheddingMiddleware,
+        prefix="/api",
+        max_in_flight=10,
+        max_pool_wait=1.0,
+        pool_wait=lambda: pool_wait,
+        shares={"GET /api/items/{id}": 0.5, "POST": 0.8},
+        retry_after=3,
+    )
+
+    @app.get("/api/items/")
+    @app.get("/api/items/{id}")
+    @app.post("/api/items/")
+    @app.get("/metrics")
+    def route() -> int:
+        return shedder(app).in_flight
+
+    return app
+
+
+def shedder(app: FastAPI) -> LoadSheddingMiddleware:
+    middleware = app.middleware_stack.app  # type: ignore
+    assert isinstance(middleware, LoadSheddingMiddleware)
+    return middleware
+
+
+@pytest.fixture
+def client() -> Iterator[TestClient]:
+    global pool_wait
+    pool_wait = 0.0
+    with TestClient(create_app()) as c:
+        c.get("/metrics")
+        yield c
+
+
+def set_in_flight(client: TestClient, in_flight: int) -> None:
+    shedder(client.app).in_flight = in_flight  # type: ignore
+
+
+def assert_shed(client: TestClient, method: str, url: str) -> None:
+    r = client.request(method, url)
+    assert r.status_code == 503
+    assert r.headers["Retry-After"] == "3"
+    assert r.json() == {"detail": "The server is overloaded, retry later"}
+
+
+def test_requests_counted_in_flight(client: TestClient) -> None:
+    r = client.get("/api/items/")
+    assert r.status_code == 200
+    assert r.json() == 1
+    assert shedder(client.app).in_flight == 0  # type: ignore
+
+
+@pytest.mark.parametrize(
+    "method,url,max_in_flight",
+    [
+        ("GET", "/api/items/", 10),
+        ("GET", "/api/items/1", 5),
+        ("POST", "/api/items/", 8),
+    ],
+)
+def test_shed_on_in_flight(
+    client: TestClient, method: str, url: str, max_in_flight: int
+) -> None:
+    set_in_flight(client, max_in_flight - 1)
+    assert client.request(method, url).status_code == 200
+    set_in_flight(client, max_in_flight)
+    assert_shed(client, method, url)
+
+
+@pytest.mark.parametrize(
+    "method,url,max_pool_wait",
+    [
+        ("GET", "/api/items/", 1.0),
+        ("GET", "/api/items/1", 0.5),
+        ("POST", "/api/items/", 0.8),
+    ],
+)
+def test_shed_on_pool_wait(
+    client: TestClient, method: str, url: str, max_pool_wait: float
+) -> None:
+    global pool_wait
+    pool_wait = max_pool_wait - 0.01
+    assert client.request(method, url).status_code == 200
+    pool_wait = max_pool_wait
+    assert_shed(client, method, url)
+
+
+def test_shed_requests_counted(client: TestClient) -> None:
+    counter = metrics.HTTP_REQUESTS_SHED.labels("GET", "/api/items/{id}")
+    before = counter._value.get()
+    set_in_flight(client, 5)
+    assert_shed(client, "GET", "/api/items/1")
+    assert counter._value.get() == before + 1
+
+
+def test_other_paths_not_shed(client: TestClient) -> None:
+    global pool_wait
+    pool_wait = 10.0
+    set_in_flight(client, 100)
+    assert client.get("/metrics").status_code == 200
@@ -0,0 +1,50 @@
+import time
+
+from fastapi import FastAPI, Request
+from fastapi.testclient import TestClient
+
+from app.db.session import read_routing
+from app.middleware.read_your_writes import ReadYourWritesMiddleware
+
+COOKIE = ReadYourWritesMiddleware.cookie_name
+
+app = FastAPI()
+app.add_middleware(ReadYourWritesMiddleware, window=5)
+
+
+@app.api_route("/", methods=["GET", "HEAD", "POST", "PATCH", "DELETE"])
+def route(request: Request, write: bool = False) -> dict[str, bool]:
+    routing = read_routing.get()
+    assert routing
+    routing.wrote = write
+    return {"sticky": routing.sticky}
+
+
+def test_get_reads_from_replicas() -> None:
+    with TestClient(app) as client:
+        r = client.get("/")
+        assert r.json() == {"sticky": False}
+        assert COOKIE not in r.cookies
+
+
+def test_other_methods_read_from_primary() -> None:
+    with TestClient(app) as client:
+        for method in ["POST", "PATCH", "DELETE"]:
+            assert client.request(method, "/").json() == {"sticky": True}
+
+
+def test_reads_stay_on_primary_after_a_write() -> None:
+    with TestClient(app) as client:
+        r = client.post("/", params={"write": True})
+        until = float(r.cookies[COOKIE])
+        assert time.time() < until <= time.time() + 5
+        # The client sends the cookie back
+        assert client.get("/").json() == {"sticky": True}
+
+
+def test_expired_cookie() -> None:
+    with TestClient(app) as client:
+        client.cookies.set(COOKIE, str(time.time() - 1))
+        assert client.get("/").json() == {"sticky": False}
+        client.cookies.set(COOKIE, "not a timestamp")
+        assert client.get("/").json() == {"sticky": False}
@@ -0,0 +1,168 @@
+import gc
+import importlib.util
+from pathlib import Path
+from types import ModuleType, SimpleNamespace
+from typing import Any
+from unittest.mock import Mock
+
+import pytest
+
+# Next to the app directory, at /gunicorn_conf.py in the image
+GUNICORN_CONF = Path(__file__).parents[3] / "gunicorn_conf.py"
+
+
+@pytest.fixture(scope="module")
+def conf() -> ModuleType:
+    spec = importlib.util.spec_from_file_location("gunicorn_conf", GUNICORN_CONF)
+    assert spec and spec.loader
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def write_files(root: Path, files: dict[str, str]) -> str:
+    for name, content in files.items():
+        path = root / name
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(f"{content}\n")
+    return str(root)
+
+
+@pytest.mark.parametrize(
+    "files, limit",
+    [
+        ({"cpu.max": "150000 100000"}, 1.5),
+        ({"cpu.max": "50000"}, 0.5),
+        ({"cpu.max": "max 100000"}, None),
+        ({"cpu/cpu.cfs_quota_us": "200000", "cpu/cpu.cfs_period_us": "100000"}, 2),
+        (
+            {
+                "cpu,cpuacct/cpu.cfs_quota_us": "50000",
+                "cpu,cpuacct/cpu.cfs_period_us": "100000",
+            },
+            0.5,
+        ),
+        ({"cpu/cpu.cfs_quota_us": "-1", "cpu/cpu.cfs_period_us": "100000"}, None),
+        ({}, None),
+    ],
+)
+def test_read_cgroup_cpu_limit(
+    conf: ModuleType, tmp_path: Path, files: dict[str, str], limit: float | None
+) -> None:
+    assert conf.read_cgroup_cpu_limit(write_files(tmp_path, files)) == limit
+
+
+@pytest.mark.parametrize(
+    "files, limit",
+    [
+        ({"memory.max": "536870912"}, 512 * 1024 * 1024),
+        ({"memory.max": "max"}, None),
+        ({"memory/memory.limit_in_bytes": "1073741824"}, 1024 * 1024 * 1024),
+        # What cgroup v1 reports without a limit, rounded down to the page size
+        ({"memory/memory.limit_in_bytes": "9223372036854771712"}, None),
+        ({}, None),
+    ],
+)
+def test_read_cgroup_memory_limit(
+    conf: ModuleType, tmp_path: Path, files: dict[str, str], limit: int | None
+) -> None:
+    assert conf.read_cgroup_memory_limit(write_files(tmp_path, files)) == limit
+
+
+def plan(conf: ModuleType, **kwargs: Any) -> dict[str, Any]:
+    options: dict[str, Any] = {
+        "cores": 8,
+        "cpu_limit": None,
+        "memory_limit": None,
+        "workers_per_core": 1,
+        "max_workers": None,
+        "web_concurrency": None,
+        "worker_memory": 256 * 1024 * 1024,
+        "db_max_connections": None,
+        "db_pool_size": 5,
+        "db_max_overflow": 10,
+        **kwargs,
+    }
+    return conf.plan_workers(**options)
+
+
+def test_plan_workers_from_cores(conf: ModuleType) -> None:
+    assert plan(conf) == {"cpus": 8, "workers": 8}
+    assert plan(conf, workers_per_core=2, max_workers=10)["workers"] == 10
+    # At least 2 workers, even on a single core
+    assert plan(conf, cores=1)["workers"] == 2
+
+
+def test_plan_workers_from_cgroup_limits(conf: ModuleType) -> None:
+    assert plan(conf, cpu_limit=2.5) == {"cpus": 2.5, "workers": 2}
+    assert plan(conf, cpu_limit=16)["cpus"] == 8
+    memory_limit = 3 * 256 * 1024 * 1024
+    assert plan(conf, memory_limit=memory_limit)["workers"] == 3
+    assert plan(conf, memory_limit=100 * 1024 * 1024)["workers"] == 1
+
+
+def test_plan_workers_web_concurrency(conf: ModuleType) -> None:
+    # Set explicitly, it is not capped by the cgroup limits
+    assert plan(conf, web_concurrency=12, cpu_limit=1)["workers"] == 12
+
+
+def test_plan_workers_db_connection_budget(conf: ModuleType) -> None:
+    # 100 connections for 8 workers, 2 pools each: 6 connections per pool
+    assert plan(conf, db_max_connections=100) == {
+        "cpus": 8,
+        "workers": 8,
+        "db_pool_size": 5,
+        "db_max_overflow": 1,
+    }
+    assert plan(conf, db_max_connections=40, db_pool_size=10) == {
+        "cpus": 8,
+        "workers": 8,
+        "db_pool_size": 2,
+        "db_max_overflow": 0,
+    }
+    # Overflow connections are capped, leaving the rest of a large budget unused
+    assert plan(conf, db_max_connections=1000) == {
+        "cpus": 8,
+        "workers": 8,
+        "db_pool_size": 5,
+        "db_max_overflow": 10,
+    }
+    assert plan(conf, db_max_connections=1000, db_max_overflow=0) == {
+        "cpus": 8,
+        "workers": 8,
+        "db_pool_size": 5,
+        "db_max_overflow": 0,
+    }
+    # Workers are reduced so that each pool gets a connection
+    assert plan(conf, db_max_connections=6) == {
+        "cpus": 8,
+        "workers": 3,
+        "db_pool_size": 1,
+        "db_max_overflow": 0,
+    }
+
+
+@pytest.mark.parametrize("db_max_connections", [0, 1])
+def test_plan_workers_rejects_small_db_budget(
+    conf: ModuleType, db_max_connections: int
+) -> None:
+    with pytest.raises(ValueError):
+        plan(conf, db_max_connections=db_max_connections)
+
+
+def test_when_ready_freezes_the_preloaded_app(
+    conf: ModuleType, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    monkeypatch.setattr(conf, "preload_app", True)
+    app = SimpleNamespace(openapi=Mock())
+    server = SimpleNamespace(app=SimpleNamespace(wsgi=lambda: app))
+    gc.disable()
+    try:
+        conf.when_ready(server)
+        app.openapi.assert_called_once_with()
+        assert gc.get_freeze_count() > 0
+        # The master collects again once the app is frozen
+        assert gc.isenabled()
+    finally:
+        gc.unfreeze()
+        gc.enable()
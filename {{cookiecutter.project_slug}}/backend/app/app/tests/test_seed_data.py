@@ -0,0 +1,76 @@
+import argparse
+import random
+from typing import Iterator
+
+import pytest
+from sqlalchemy import text
+
+from app import seed_data
+from app.db.session import get_engine_async
+from app.tests.utils.utils import Run
+
+SEEDED_USERS = text('SELECT count(*) FROM "user" WHERE email LIKE :pattern')
+SEEDED_ITEMS = text(
+    'SELECT count(*) FROM item JOIN "user" ON "user".id = item.owner_id '
+    "WHERE email LIKE :pattern"
+)
+LAST_USER_ID = text('SELECT coalesce(max(id), 0) FROM "user"')
+DELETE_ITEMS = text(
+    'DELETE FROM item USING "user" WHERE "user".id = item.owner_id '
+    'AND "user".id > :id AND "user".email LIKE :pattern'
+)
+DELETE_USERS = text('DELETE FROM "user" WHERE id > :id AND email LIKE :pattern')
+PATTERN = {"pattern": f"%@{seed_data.EMAIL_DOMAIN}"}
+
+
+async def count_seeded() -> tuple[int, int]:
+    async with get_engine_async().connect() as conn:
+        users = await conn.scalar(SEEDED_USERS, PATTERN)
+        items = await conn.scalar(SEEDED_ITEMS, PATTERN)
+    return users, items
+
+
+async def get_last_user_id() -> int:
+    async with get_engine_async().connect() as conn:
+        return await conn.scalar(LAST_USER_ID)
+
+
+async def delete_seeded_after(id: int) -> None:
+    async with get_engine_async().begin() as conn:
+        await conn.execute(DELETE_ITEMS, {"id": id, **PATTERN})
+        await conn.execute(DELETE_USERS, {"id": id, **PATTERN})
+
+
+@pytest.fixture
+def cleanup(run: Run) -> Iterator[None]:
+    """
+    Delete the users seeded by the test, numbered after the ones already present,
+    and their items.
+    """
+    last_user_id = run(get_last_user_id)
+    yield
+    run(delete_seeded_after, last_user_id)
+
+
+def test_seed_rows_are_committed(run: Run, cleanup: None) -> None:
+    args = argparse.Namespace(
+        users=50,
+        items=300,
+        skew=1.1,
+        passwords=1,
+        batch_size=40,
+        jobs=3,
+        random_seed=0,
+    )
+    users, items = run(count_seeded)
+    run(seed_data.seed, args)
+    # Counted from new connections, the rows must have been committed
+    assert run(count_seeded) == (users + 50, items + 300)
+
+
+def test_item_rows_depend_on_the_seed_only() -> None:
+    def make_rows(seed: str) -> list[tuple]:
+        return seed_data.item_rows(random.Random(seed), 100, [1, 2, 3], [1, 1.5, 2])
+
+    assert make_rows("0-0") == make_rows("0-0")
+    assert make_rows("0-0") != make_rows("0-100")
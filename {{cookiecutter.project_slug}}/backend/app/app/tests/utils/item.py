@@ -0,0 +1,19 @@
+from app import crud
+from app.db.session import AsyncSession
+from app.models import Item, ItemCreate
+from app.tests.utils.utils import random_lower_string
+
+
+async def create_random_items(owner_id: int, count: int) -> list[Item]:
+    objs_in = [
+        ItemCreate(title=random_lower_string(), owner_id=owner_id) for _ in range(count)
+    ]
+    async with AsyncSession() as db:
+        return await crud.item.create_many_with_owner(
+            db, objs_in=objs_in, owner_id=owner_id
+        )
+
+
+async def get_item(id: int) -> Item | None:
+    async with AsyncSession() as db:
+        return await crud.item.get(db, id)
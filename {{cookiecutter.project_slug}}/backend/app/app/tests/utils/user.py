@@ -0,0 +1,20 @@
+from sqlalchemy import delete
+
+from app import crud
+from app.db.session import AsyncSession
+from app.models import Item, User, UserCreate
+from app.tests.utils.utils import random_email, random_lower_string
+
+
+async def create_random_user(**fields: bool) -> tuple[User, str]:
+    password = random_lower_string()
+    user_in = UserCreate(email=random_email(), password=password, **fields)
+    async with AsyncSession() as db:
+        user = await crud.user.create(db, obj_in=user_in)
+    return user, password
+
+
+async def delete_user(id: int) -> None:
+    async with AsyncSession() as db:
+        await db.execute(delete(Item).where(Item.owner_id == id))
+        await crud.user.remove_many(db, ids=[id])
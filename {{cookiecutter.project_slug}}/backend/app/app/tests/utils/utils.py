@@ -0,0 +1,35 @@
+import random
+import string
+from typing import Any, Callable
+
+from fastapi.testclient import TestClient
+
+from app.core.config import settings
+
+# Runs an async function on the event loop of the app, see the `run` fixture
+Run = Callable[..., Any]
+
+
+def random_lower_string() -> str:
+    return "".join(random.choices(string.ascii_lowercase, k=32))
+
+
+def random_email() -> str:
+    return f"{random_lower_string()}@{random_lower_string()}.com"
+
+
+def login_headers(client: TestClient, *, email: str, password: str) -> dict[str, str]:
+    r = client.post(
+        f"{settings.API_V1_STR}/login/access-token",
+        data={"username": email, "password": password},
+    )
+    tokens = r.json()
+    return {"Authorization": f"Bearer {tokens['access_token']}"}
+
+
+def get_superuser_token_headers(client: TestClient) -> dict[str, str]:
+    return login_headers(
+        client,
+        email=settings.FIRST_SUPERUSER,
+        password=settings.FIRST_SUPERUSER_PASSWORD,
+    )
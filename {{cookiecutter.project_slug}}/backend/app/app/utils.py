@@ -1,10 +1,6 @@
-import logging
 from datetime import datetime, timedelta
-from pathlib import Path
 from typing import Any
 
-import emails
-from emails.template import JinjaTemplate
 from jose import JWTError, jwt
 
 from app.core.config import settings
@@ -12,36 +8,37 @@ from app.core.config import settings
 
 def send_email(
     email_to: str,
-    subject_template: str = "",
+    subject: str = "",
     html_template: str = "",
     environment: dict[str, Any] = {},
 ) -> None:
+    """
+    Queue an email for background delivery.
+
+    `html_template` is the file name of a template of `EMAIL_TEMPLATES_DIR`.
+    """
     assert settings.EMAILS_ENABLED, "no provided configuration for email variables"
-    message = emails.Message(
-        subject=JinjaTemplate(subject_template),
-        html=JinjaTemplate(html_template),
-        mail_from=(settings.EMAILS_FROM_NAME, settings.EMAILS_FROM_EMAIL),
+    # Imported on first use, as the emails package is slow to import and
+    # unused when emails are disabled
+    from app.core.mail import EmailJob, get_template, mail_queue
+
+    mail_queue.enqueue(
+        EmailJob(
+            email_to=email_to,
+            subject=subject,
+            html_template=get_template(html_template),
+            environment=environment,
+        )
     )
-    smtp_options = {"host": settings.SMTP_HOST, "port": settings.SMTP_PORT}
-    if settings.SMTP_TLS:
-        smtp_options["tls"] = True
-    if settings.SMTP_USER:
-        smtp_options["user"] = settings.SMTP_USER
-    if settings.SMTP_PASSWORD:
-        smtp_options["password"] = settings.SMTP_PASSWORD
-    response = message.send(to=email_to, render=environment, smtp=smtp_options)
-    logging.info(f"send email result: {response}")
 
 
 def send_test_email(email_to: str) -> None:
     project_name = settings.PROJECT_NAME
     subject = f"{project_name} - Test email"
-    with open(Path(settings.EMAIL_TEMPLATES_DIR) / "test_email.html") as f:
-        template_str = f.read()
     send_email(
         email_to=email_to,
-        subject_template=subject,
-        html_template=template_str,
+        subject=subject,
+        html_template="test_email.html",
         environment={"project_name": settings.PROJECT_NAME, "email": email_to},
     )
 
@@ -49,14 +46,12 @@ def send_test_email(email_to: str) -> None:
 def send_reset_password_email(email_to: str, email: str, token: str) -> None:
     project_name = settings.PROJECT_NAME
     subject = f"{project_name} - Password recovery for user {email}"
-    with open(Path(settings.EMAIL_TEMPLATES_DIR) / "reset_password.html") as f:
-        template_str = f.read()
     server_host = settings.SERVER_HOST
     link = f"{server_host}/reset-password?token={token}"
     send_email(
         email_to=email_to,
-        subject_template=subject,
-        html_template=template_str,
+        subject=subject,
+        html_template="reset_password.html",
         environment={
             "project_name": settings.PROJECT_NAME,
             "username": email,
@@ -70,13 +65,11 @@ def send_reset_password_email(email_to: str, email: str, token: str) -> None:
 def send_new_account_email(email_to: str, username: str, password: str) -> None:
     project_name = settings.PROJECT_NAME
     subject = f"{project_name} - New account for user {username}"
-    with open(Path(settings.EMAIL_TEMPLATES_DIR) / "new_account.html") as f:
-        template_str = f.read()
     link = settings.SERVER_HOST
     send_email(
         email_to=email_to,
-        subject_template=subject,
-        html_template=template_str,
+        subject=subject,
+        html_template="new_account.html",
         environment={
             "project_name": settings.PROJECT_NAME,
             "username": username,
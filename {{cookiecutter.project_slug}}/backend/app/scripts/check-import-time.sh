@@ -0,0 +1,5 @@
+#!/bin/sh -e
+set -x
+
+# Fails when importing the app gets slower than the budget, e.g. --budget-ms 800
+python -m app.benchmarks.import_time "$@"
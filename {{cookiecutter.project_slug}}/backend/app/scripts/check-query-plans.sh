@@ -0,0 +1,5 @@
+#!/bin/sh -e
+set -x
+
+# Needs a migrated database, the seeded rows are rolled back
+python app/query_plans.py
@@ -0,0 +1,5 @@
+#!/bin/sh -e
+set -x
+
+# Needs a migrated database, e.g. scripts/seed-data.sh --users 100000 --items 10000000
+python app/seed_data.py "$@"
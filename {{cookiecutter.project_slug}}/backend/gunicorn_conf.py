@@ -1,8 +1,123 @@
 # From https://github.com/tiangolo/uvicorn-gunicorn-docker/blob/master/docker-images/gunicorn_conf.py
+import gc
 import json
-import multiprocessing
 import os
 
+CGROUP_ROOT = "/sys/fs/cgroup"
+# Memory limits of cgroup v1 at or above this are the kernel's "unlimited"
+CGROUP_V1_UNLIMITED = 1 << 60
+# Connection pools each worker may open to the primary database: the sync and
+# the async engines of app/db/session.py. The endpoints use the async one, but
+# the sync one backs `deps.get_db` for sync endpoints, and only connects once
+# used: reserving connections for it keeps the budget safe either way.
+DB_POOLS_PER_WORKER = 2
+
+
+def _read_cgroup_file(path: str) -> str | None:
+    try:
+        with open(path) as f:
+            return f.read().strip()
+    except OSError:
+        return None
+
+
+def read_cgroup_cpu_limit(root: str = CGROUP_ROOT) -> float | None:
+    """
+    CPU quota of the container in cores, None when unlimited.
+    """
+    # cgroup v2: "<quota> <period>", quota being "max" when unlimited
+    cpu_max = _read_cgroup_file(os.path.join(root, "cpu.max"))
+    if cpu_max is not None:
+        quota, _, period = cpu_max.partition(" ")
+        if quota == "max":
+            return None
+        return int(quota) / int(period or 100000)
+    # cgroup v1: a quota of -1 means unlimited
+    for controller in ("cpu", "cpu,cpuacct"):
+        quota_us = _read_cgroup_file(os.path.join(root, controller, "cpu.cfs_quota_us"))
+        period_us = _read_cgroup_file(
+            os.path.join(root, controller, "cpu.cfs_period_us")
+        )
+        if quota_us is not None and period_us is not None:
+            if int(quota_us) <= 0:
+                return None
+            return int(quota_us) / int(period_us)
+    return None
+
+
+def read_cgroup_memory_limit(root: str = CGROUP_ROOT) -> int | None:
+    """
+    Memory limit of the container in bytes, None when unlimited.
+    """
+    memory_max = _read_cgroup_file(os.path.join(root, "memory.max"))
+    if memory_max is not None:
+        return None if memory_max == "max" else int(memory_max)
+    limit = _read_cgroup_file(os.path.join(root, "memory", "memory.limit_in_bytes"))
+    if limit is None or int(limit) >= CGROUP_V1_UNLIMITED:
+        return None
+    return int(limit)
+
+
+def get_available_cores() -> int:
+    # Honours the cpuset of the container, unlike multiprocessing.cpu_count()
+    if hasattr(os, "sched_getaffinity"):
+        return len(os.sched_getaffinity(0))
+    return os.cpu_count() or 1
+
+
+def plan_workers(
+    *,
+    cores: int,
+    cpu_limit: float | None,
+    memory_limit: int | None,
+    workers_per_core: float,
+    max_workers: int | None,
+    web_concurrency: int | None,
+    worker_memory: int,
+    db_max_connections: int | None,
+    db_pool_size: int,
+    db_max_overflow: int,
+) -> dict:
+    """
+    Number of workers and database pool sizes of each worker.
+
+    Without WEB_CONCURRENCY, workers follow the CPUs usable by the container
+    (its cgroup quota, else its cores), at least 2, and are capped to fit both
+    the memory limit, `worker_memory` bytes each, and MAX_WORKERS.
+
+    With a total `db_max_connections` budget, each pool gets its share of it,
+    persistent connections up to `db_pool_size` and the rest as overflow up to
+    `db_max_overflow`, and workers are reduced so that each pool gets at least
+    one connection. A budget too small for the pools of a single worker is
+    refused.
+    """
+    if db_max_connections is not None and db_max_connections < DB_POOLS_PER_WORKER:
+        raise ValueError(
+            f"DB_MAX_CONNECTIONS must be at least {DB_POOLS_PER_WORKER}, a "
+            "connection for each database pool of a worker"
+        )
+    cpus = min(cores, cpu_limit) if cpu_limit else cores
+    if web_concurrency:
+        workers = web_concurrency
+    else:
+        workers = max(int(workers_per_core * cpus), 2)
+        if memory_limit:
+            workers = min(workers, max(memory_limit // worker_memory, 1))
+        if max_workers:
+            workers = min(workers, max_workers)
+    plan: dict = {"cpus": cpus, "workers": workers}
+    if db_max_connections:
+        workers = min(workers, max(db_max_connections // DB_POOLS_PER_WORKER, 1))
+        pool_connections = max(db_max_connections // workers // DB_POOLS_PER_WORKER, 1)
+        pool_size = min(db_pool_size, pool_connections)
+        plan.update(
+            workers=workers,
+            db_pool_size=pool_size,
+            db_max_overflow=min(db_max_overflow, pool_connections - pool_size),
+        )
+    return plan
+
+
 workers_per_core_str = os.getenv("WORKERS_PER_CORE", "1")
 max_workers_str = os.getenv("MAX_WORKERS")
 use_max_workers = None
@@ -19,16 +134,39 @@ if bind_env:
 else:
     use_bind = f"{host}:{port}"
 
-cores = multiprocessing.cpu_count()
+cores = get_available_cores()
+cpu_limit = read_cgroup_cpu_limit()
+memory_limit = read_cgroup_memory_limit()
 workers_per_core = float(workers_per_core_str)
-default_web_concurrency = workers_per_core * cores
+use_web_concurrency = None
 if web_concurrency_str:
-    web_concurrency = int(web_concurrency_str)
-    assert web_concurrency > 0
-else:
-    web_concurrency = max(int(default_web_concurrency), 2)
-    if use_max_workers:
-        web_concurrency = min(web_concurrency, use_max_workers)
+    use_web_concurrency = int(web_concurrency_str)
+    assert use_web_concurrency > 0
+# Resident memory budgeted for each worker, to cap workers to the memory limit
+worker_memory_mb = int(os.getenv("WORKER_MEMORY_MB", "256"))
+# Connections to the primary database allowed for all the workers of this
+# container, e.g. its share of Postgres' max_connections
+db_max_connections_str = os.getenv("DB_MAX_CONNECTIONS")
+use_db_max_connections = None
+if db_max_connections_str:
+    use_db_max_connections = int(db_max_connections_str)
+plan = plan_workers(
+    cores=cores,
+    cpu_limit=cpu_limit,
+    memory_limit=memory_limit,
+    workers_per_core=workers_per_core,
+    max_workers=use_max_workers,
+    web_concurrency=use_web_concurrency,
+    worker_memory=worker_memory_mb * 1024 * 1024,
+    db_max_connections=use_db_max_connections,
+    db_pool_size=int(os.getenv("DB_POOL_SIZE", "5")),
+    db_max_overflow=int(os.getenv("DB_MAX_OVERFLOW", "10")),
+)
+web_concurrency = plan["workers"]
+if "db_pool_size" in plan:
+    # Read by app.core.config in the workers, which inherit the environment
+    os.environ["DB_POOL_SIZE"] = str(plan["db_pool_size"])
+    os.environ["DB_MAX_OVERFLOW"] = str(plan["db_max_overflow"])
 accesslog_var = os.getenv("ACCESS_LOG", "-")
 use_accesslog = accesslog_var or None
 errorlog_var = os.getenv("ERROR_LOG", "-")
@@ -36,6 +174,8 @@ use_errorlog = errorlog_var or None
 graceful_timeout_str = os.getenv("GRACEFUL_TIMEOUT", "120")
 timeout_str = os.getenv("TIMEOUT", "120")
 keepalive_str = os.getenv("KEEP_ALIVE", "5")
+# Import the app once in the master, its memory then being shared by the workers
+preload_app_str = os.getenv("PRELOAD_APP", "false")
 
 # Gunicorn config variables
 loglevel = use_loglevel
@@ -47,6 +187,40 @@ accesslog = use_accesslog
 graceful_timeout = int(graceful_timeout_str)
 timeout = int(timeout_str)
 keepalive = int(keepalive_str)
+preload_app = preload_app_str.lower() in ("1", "true")
+
+if preload_app:
+    # Not collected while the app loads, so that its objects are packed in
+    # pages the workers then share, rather than scattered among freed ones
+    gc.disable()
+
+
+def when_ready(server):
+    if preload_app:
+        app = server.app.wsgi()
+        # Build what FastAPI otherwise builds on the first request of each worker
+        if hasattr(app, "openapi"):
+            app.openapi()
+        # Move the objects of the app out of the collector's reach, so that the
+        # workers never write to, and so copy, the pages they live in. The
+        # master, and the workers it forks, then collect their own objects.
+        gc.collect()
+        gc.freeze()
+        gc.enable()
+
+
+def pre_fork(server, worker):
+    if preload_app:
+        # Also freeze what the master allocated since, e.g. for a dead worker
+        gc.freeze()
+
+
+def child_exit(server, worker):
+    # Drop the live gauges of a dead worker from the aggregated Prometheus metrics
+    if os.getenv("PROMETHEUS_MULTIPROC_DIR"):
+        from prometheus_client import multiprocess
+
+        multiprocess.mark_process_dead(worker.pid)
 
 
 # For debugging and testing
@@ -57,12 +231,18 @@ log_data = {
     "graceful_timeout": graceful_timeout,
     "timeout": timeout,
     "keepalive": keepalive,
+    "preload_app": preload_app,
     "errorlog": errorlog,
     "accesslog": accesslog,
     # Additional, non-gunicorn variables
     "workers_per_core": workers_per_core,
     "use_max_workers": use_max_workers,
+    "cores": cores,
+    "cgroup_cpu_limit": cpu_limit,
+    "cgroup_memory_limit": memory_limit,
+    "db_max_connections": use_db_max_connections,
+    "plan": plan,
     "host": host,
     "port": port,
 }
-print(json.dumps(log_data))
\ No newline at end of file
+print(json.dumps(log_data))
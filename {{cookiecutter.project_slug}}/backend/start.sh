@@ -31,5 +31,14 @@ else
     echo "There is no script $PRE_START_PATH"
 fi
 
+# Shared directory where each worker writes its Prometheus metrics, emptied on start
+export PROMETHEUS_MULTIPROC_DIR=${PROMETHEUS_MULTIPROC_DIR:-/dev/shm/prometheus}
+rm -rf "$PROMETHEUS_MULTIPROC_DIR"
+mkdir -p "$PROMETHEUS_MULTIPROC_DIR"
+
+# Set PRELOAD_APP=true to import the app once in the master process, sharing its
+# memory with the workers, which still create their database pools after the fork
+export PRELOAD_APP=${PRELOAD_APP:-false}
+
 # Start Gunicorn
 exec gunicorn -k "$WORKER_CLASS" -c "$GUNICORN_CONF" "$APP_MODULE"
\ No newline at end of file